@@ -1,12 +1,20 @@
 import os
+import json
+import time
 import uuid
+import shutil
+import tempfile
+import threading
 import functools
+import hashlib
 from datetime import datetime, timedelta
 from collections import defaultdict
+from typing import NamedTuple
 
 from flask import (
     Flask, render_template, request, redirect,
-    url_for, flash, jsonify, Response, send_from_directory, abort
+    url_for, flash, jsonify, Response, send_from_directory, abort,
+    stream_with_context, make_response
 )
 from flask_login import (
     LoginManager, login_user, current_user,
@@ -14,17 +22,30 @@ from flask_login import (
 )
 from flask_wtf.csrf import CSRFProtect, CSRFError
 from werkzeug.utils import secure_filename
-from sqlalchemy import or_
+from sqlalchemy import func, or_
 
 from config import Config
 from database import db
 from models import User, Property, Booking, Favorite, Review, PredictionResult
+from prediction_cache import PredictionCache
+from prediction_batcher import MicroBatcher
+from listings import DEFAULT_PAGE_SIZE, EMPTY_CATALOG, ListingCatalog, parse_query as parse_listing_query
+from fast_predictor import FastForestPredictor, check_parity, probe_rows
+from lookup_table import PredictionLookupTable, check_knots, knot_rows
+import model_store
+from search_index import (
+    DEFAULT_SUGGESTIONS, KINDS as SEARCH_KINDS, MAX_FILTER_CITIES, SearchIndex, build_search_index,
+)
+from ui_dataset import (
+    EMPTY_SNAPSHOT, DatasetSnapshot, build_dataset_snapshot, derive_pid_from_row, measure_untyped_load,
+)
 from forms import (
     LoginForm, RegistrationForm, PropertyForm, BookingForm, SearchForm,
     EditProfileForm, ChangePasswordForm, ReviewForm,
     RequestResetForm, ResetPasswordForm, PredictRentForm
 )
 
+import numpy as np
 import pandas as pd
 import joblib
 import folium
@@ -181,39 +202,460 @@ def rate_limit(max_attempts=10, window_seconds=600):
 
 # These files live in the same folder as app.py
 MODEL_PATH = os.path.join(BASE_DIR, "house_rent_model.pkl")
+FAST_MODEL_PATH = os.path.join(BASE_DIR, "house_rent_model_fast.pkl")
+LOOKUP_PATH = os.path.join(BASE_DIR, "house_rent_model_lut.pkl")
 UI_DATASET_PATH = os.path.join(BASE_DIR, "House_Rent_10k_major_cities.csv")
 DATASET_PATH = os.getenv("DATASET_PATH", UI_DATASET_PATH)
 
-model = None
-ui_df = None
+# Same seven features train_model.py fits the pipeline on
+PREDICTION_FEATURES = [
+    "Size", "BHK", "Bathroom", "City",
+    "Furnishing Status", "Tenant Preferred", "Area Type",
+]
+
+serving_model = None      # ServingModel currently answering predictions
+previous_model = None     # kept loaded for instant rollback
+dataset_snapshot = EMPTY_SNAPSHOT   # UI dataset and its indexes, swapped as a single reference
+
+prediction_cache = PredictionCache(
+    max_entries=app.config["PREDICTION_CACHE_SIZE"],
+    ttl_seconds=app.config["PREDICTION_CACHE_TTL"],
+    size_bucket=app.config["PREDICTION_CACHE_SIZE_BUCKET"],
+)
+
+
+class ServingModel(NamedTuple):
+    """Everything one prediction needs, swapped as a single reference."""
+    version: str
+    pipeline: object
+    fast: object = None
+    meta: dict = None         # normalised to a dict by set_model
+    loaded_at: str = ""
+    generation: int = 0
+    lookup: object = None
+    shards: dict = None       # city -> CityShard, for cities with their own model
+
 
-def load_ui_dataset(path: str) -> None:
-    global ui_df
+class CityShard(NamedTuple):
+    """One city's model from a sharded version (train_model.py --sharded)."""
+    pipeline: object
+    fast: object = None
+
+
+def load_fast_predictor(pipeline, path: str, mmap_mode=None, verify: bool = True):
+    """Load the NumPy fast path exported by train_model.py for ``pipeline``.
+
+    Returns None when disabled, missing, or when it does not reproduce the
+    pipeline's predictions (e.g. a stale file left over from an older model).
+    ``verify=False`` skips that probe for store versions, whose fast arrays
+    were checked against the pipeline when train_model.py exported them.
+    """
+    if pipeline is None or not app.config["USE_FAST_PREDICTOR"] or not os.path.exists(path):
+        return None
     try:
-        if os.path.exists(path):
-            df = pd.read_csv(path)
-            df.columns = df.columns.str.strip()
-            ui_df = df
-            app.logger.info(f"UI dataset loaded from {path}")
-        else:
-            ui_df = None
-            app.logger.warning(f"Dataset not found at {path}")
+        fast = FastForestPredictor.load(path, mmap_mode=mmap_mode)
+        if fast.feature_order != PREDICTION_FEATURES:
+            raise ValueError(f"unexpected feature order {fast.feature_order}")
+        if verify:
+            check_parity(pipeline, fast, probe_rows(fast))
+        return fast
     except Exception as e:
-        ui_df = None
-        app.logger.error(f"Dataset load error: {e}")
+        app.logger.warning(f"Fast predictor not used: {e}")
+        return None
 
-try:
-    if os.path.exists(MODEL_PATH):
-        model = joblib.load(MODEL_PATH)
-        app.logger.info("ML model loaded successfully.")
+
+def load_lookup_table(pipeline, path: str, mmap_mode=None, verify: bool = True):
+    """Load the precomputed grid table written by ``train_model.py --lookup-table``.
+
+    Returns None when disabled, missing, or when its knot values do not match
+    ``pipeline`` (a table left over from another model).
+    """
+    if pipeline is None or not app.config["USE_LOOKUP_TABLE"] or not os.path.exists(path):
+        return None
+    try:
+        table = PredictionLookupTable.load(path, mmap_mode=mmap_mode)
+        if verify:
+            check_knots(pipeline, table, knot_rows(table))
+        return table
+    except Exception as e:
+        app.logger.warning(f"Lookup table not used: {e}")
+        return None
+
+
+def load_city_shards(version: str, mmap_mode=None) -> dict:
+    """Load the served entries of ``version``'s shard manifest.
+
+    Shards are small, so they are loaded eagerly; a shard that fails to
+    load is skipped and its city falls back to the global model.
+    """
+    if not app.config["USE_CITY_SHARDS"]:
+        return {}
+    manifest = model_store.read_shard_manifest(version)
+    if not manifest:
+        return {}
+    directory = os.path.join(model_store.version_dir(version), model_store.SHARDS_DIRNAME)
+    shards = {}
+    for city, entry in manifest["cities"].items():
+        if not entry.get("serve"):
+            continue
+        try:
+            pipeline = joblib.load(os.path.join(directory, entry["model"]), mmap_mode=mmap_mode)
+            fast = None
+            if entry.get("fast"):
+                fast = load_fast_predictor(pipeline, os.path.join(directory, entry["fast"]),
+                                           mmap_mode=mmap_mode, verify=False)
+            shards[city] = CityShard(pipeline, fast)
+        except Exception as e:
+            app.logger.warning(f"City shard {city!r} not used: {e}")
+    return shards
+
+
+def load_serving_model(version=None) -> ServingModel:
+    """Load a model version (newest in model_store by default) and warm it.
+
+    Falls back to the unversioned MODEL_PATH written by older training runs
+    when the store is empty. Raises if nothing can be loaded or the warm-up
+    prediction fails, so a broken artifact never reaches ``set_model``.
+
+    With MODEL_MMAP the fast-path arrays are memory-mapped (shared between
+    workers through the page cache) and the sklearn pipeline is loaded
+    lazily; sklearn copies tree nodes into private memory on unpickling, so
+    mapping the pipeline pickle alone would not make them shareable.
+    """
+    mmap_mode = "r" if app.config["MODEL_MMAP"] else None
+    version = version or model_store.latest_version()
+    if version:
+        directory = model_store.version_dir(version)
+        meta = model_store.read_meta(version)
+        model_path = os.path.join(directory, model_store.MODEL_FILENAME)
+        fast_path = os.path.join(directory, model_store.FAST_MODEL_FILENAME)
+        lookup_path = os.path.join(directory, model_store.LOOKUP_FILENAME)
+    elif os.path.exists(MODEL_PATH):
+        version = "legacy-" + datetime.fromtimestamp(os.path.getmtime(MODEL_PATH)).strftime("%Y%m%dT%H%M%S")
+        meta, model_path, fast_path, lookup_path = {}, MODEL_PATH, FAST_MODEL_PATH, LOOKUP_PATH
+    else:
+        raise FileNotFoundError(f"No model in {model_store.MODEL_STORE_DIR} or at {MODEL_PATH}")
+
+    lazy = mmap_mode is not None and bool(meta)
+    if lazy:
+        pipeline = model_store.LazyPipeline(model_path, mmap_mode=mmap_mode)
     else:
-        app.logger.warning(f"Model file not found at {MODEL_PATH}")
+        pipeline = joblib.load(model_path, mmap_mode=mmap_mode)
+    fast = load_fast_predictor(pipeline, fast_path, mmap_mode=mmap_mode, verify=not lazy)
+    if lazy and fast is None:
+        pipeline = pipeline.get()
+    lookup = load_lookup_table(pipeline, lookup_path, mmap_mode=mmap_mode, verify=not lazy)
+    shards = load_city_shards(version, mmap_mode=mmap_mode) if meta else {}
+    candidate = ServingModel(version, pipeline, fast, meta, datetime.utcnow().isoformat(),
+                             lookup=lookup, shards=shards)
+    # Warm-up: exercise both prediction paths before any request can see it
+    warm_row = [(1000.0, 2, 2, "", "", "", "")]
+    _predict_uncached(warm_row, candidate)
+    for city in shards:
+        _predict_uncached([(1000.0, 2, 2, city, "", "", "")], candidate)
+    if not lazy:
+        pipeline.predict(pd.DataFrame(warm_row, columns=PREDICTION_FEATURES))
+    return candidate
+
+
+def set_model(new_serving) -> None:
+    """Publish a ServingModel and drop predictions cached for the old one.
+
+    The swap is a single reference assignment: requests that already read
+    ``serving_model`` finish on the old version, new requests get the new one.
+    """
+    global serving_model, previous_model
+    generation = prediction_cache.invalidate()
+    if serving_model is not None and new_serving is not None and serving_model.version != new_serving.version:
+        previous_model = serving_model
+    if new_serving is not None:
+        # Fresh containers per model: a NamedTuple default would be shared by all of them
+        new_serving = new_serving._replace(generation=generation, meta=dict(new_serving.meta or {}),
+                                           shards=dict(new_serving.shards or {}))
+    serving_model = new_serving
+
+
+def _predict_model(rows, model):
+    """Evaluate a ServingModel or CityShard: fast path for small calls."""
+    if model.fast is not None and len(rows) <= app.config["FAST_PREDICTOR_MAX_ROWS"]:
+        return model.fast.predict(rows)
+    return model.pipeline.predict(pd.DataFrame(rows, columns=PREDICTION_FEATURES))
+
+
+def _predict_global(rows, serving):
+    if serving.lookup is None:
+        return _predict_model(rows, serving)
+    # Grid table first; rows it cannot answer (untrusted cell, off-grid) use the model
+    values, hit = serving.lookup.lookup(rows)
+    if not hit.all():
+        missing = np.flatnonzero(~hit)
+        values[missing] = _predict_model([rows[i] for i in missing], serving)
+    return values
+
+
+def _predict_uncached(rows, serving):
+    if not serving.shards:
+        return _predict_global(rows, serving)
+    # One call per shard: rows grouped by City, unknown cities on the global model
+    groups = defaultdict(list)
+    for i, row in enumerate(rows):
+        groups[row[3] if row[3] in serving.shards else None].append(i)
+    if list(groups) == [None]:
+        return _predict_global(rows, serving)
+    values = np.empty(len(rows))
+    for city, idx in groups.items():
+        subset = [rows[i] for i in idx]
+        if city is None:
+            values[idx] = _predict_global(subset, serving)
+        else:
+            values[idx] = _predict_model(subset, serving.shards[city])
+    return values
+
+
+# Optional dispatcher that merges concurrent single-row requests into one
+# predict call (PREDICTION_BATCH_WINDOW_MS = 0 disables it)
+prediction_batcher = None
+if app.config["PREDICTION_BATCH_WINDOW_MS"] > 0:
+    prediction_batcher = MicroBatcher(
+        _predict_uncached,
+        window_ms=app.config["PREDICTION_BATCH_WINDOW_MS"],
+        max_rows=app.config["PREDICTION_BATCH_MAX_ROWS"],
+    )
+
+
+def _predict_batched(rows, serving):
+    values = prediction_batcher.predict(rows, serving, timeout=app.config["PREDICTION_BATCH_TIMEOUT"])
+    return np.asarray(values, dtype=float)
+
+
+def predict_rents(rows, use_cache: bool = True, serving=None, batched: bool = False):
+    """Predict rents for feature tuples in PREDICTION_FEATURES order.
+
+    Cached rows are answered from ``prediction_cache``; the remaining distinct
+    tuples are evaluated in one call, on the NumPy fast path when it is loaded
+    and the call is small, and through the sklearn pipeline otherwise.
+    Rows for a city with its own shard model go to that model instead.
+    Pass ``serving`` to pin the call to the model version a response reports.
+    With ``batched`` the uncached rows go through ``prediction_batcher`` and
+    share a predict call with other threads' requests.
+    """
+    serving = serving or serving_model
+    rows = list(rows)
+    evaluate = _predict_batched if batched and prediction_batcher is not None else _predict_uncached
+    if not use_cache or not prediction_cache.enabled:
+        return evaluate(rows, serving)
+
+    keys = [prediction_cache.make_key(row) for row in rows]
+    results = [prediction_cache.get(key, serving.generation) for key in keys]
+    missing = [i for i, value in enumerate(results) if value is None]
+    if missing:
+        pending = list(dict.fromkeys(keys[i] for i in missing))
+        values = evaluate(pending, serving)
+        computed = dict(zip(pending, (float(v) for v in values)))
+        for key, value in computed.items():
+            prediction_cache.put(key, value, serving.generation)
+        for i in missing:
+            results[i] = computed[keys[i]]
+    return np.asarray(results, dtype=float)
+
+
+# Serialises snapshot builds; requests never take it
+dataset_reload_lock = threading.Lock()
+dataset_reload_status = {"state": "idle", "source": None, "version": 0, "imported": None,
+                         "error": None, "finished_at": None}
+
+
+def load_ui_dataset(path: str) -> DatasetSnapshot:
+    """Build a snapshot of the dataset at ``path`` and publish it.
+
+    Requests keep using the current snapshot while the new one and its
+    indexes are built; publishing is a single reference assignment. When
+    the load fails the current snapshot stays in place.
+    """
+    global dataset_snapshot
+    with dataset_reload_lock:
+        dataset_reload_status.update(state="loading", source=path, imported=None, error=None)
+        try:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Dataset not found at {path}")
+            # Typed (categorical / downcast) frame, from the binary cache when current
+            snapshot = build_dataset_snapshot(
+                path,
+                version=dataset_snapshot.version + 1,
+                use_cache=app.config["UI_DATASET_CACHE"],
+                home_pool_size=app.config["HOME_FEATURED_POOL"],
+                preview_pool_size=app.config["PREVIEW_POOL_SIZE"],
+            )
+            dataset_snapshot = snapshot
+            dataset_reload_status.update(state="idle", version=snapshot.version)
+            app.logger.info(f"UI dataset loaded from {path} (snapshot {snapshot.version})")
+            return snapshot
+        except Exception as e:
+            dataset_reload_status.update(state="failed", error=str(e))
+            app.logger.error(f"Dataset load error: {e}")
+            raise
+        finally:
+            dataset_reload_status["finished_at"] = datetime.utcnow().isoformat()
+
+
+def load_ui_dataset_async(path: str, to_db: bool = False) -> None:
+    """Rebuild the snapshot off the request path, then optionally import its rows."""
+    def run():
+        try:
+            snapshot = load_ui_dataset(path)
+        except Exception:
+            return  # recorded in dataset_reload_status
+        if to_db and snapshot.has_rows:
+            with app.app_context():
+                try:
+                    dataset_reload_status["imported"] = import_properties_from_df(snapshot.frame)
+                except Exception as e:
+                    dataset_reload_status["error"] = str(e)
+                    app.logger.error(f"Dataset import failed: {e}")
+    threading.Thread(target=run, name="dataset-reload", daemon=True).start()
+
+try:
+    set_model(load_serving_model())
+    app.logger.info(f"ML model {serving_model.version} loaded successfully.")
+except Exception as e:
+    app.logger.warning(f"Model not loaded: {e}")
+try:
     load_ui_dataset(DATASET_PATH)
 except Exception as e:
-    app.logger.error(f"Error initializing model or dataset: {e}")
-    model = None
-    ui_df = None
+    app.logger.error(f"Error initializing dataset: {e}")
+
+
+# ======================================================
+# MODEL HOT RELOAD
+# ======================================================
 
+# Serialises loads and swaps; prediction requests never take it
+model_reload_lock = threading.Lock()
+model_reload_status = {"state": "idle", "version": None, "error": None, "finished_at": None}
+# Set by rollback / explicit version reloads so the watcher does not undo them
+model_pinned = False
+
+
+def reload_model(version=None, pin=None) -> ServingModel:
+    """Load ``version`` (newest by default) off the request path and swap it in."""
+    global model_pinned
+    with model_reload_lock:
+        model_reload_status.update(state="loading", version=version, error=None)
+        try:
+            candidate = load_serving_model(version)
+            if serving_model is None or candidate.version != serving_model.version:
+                set_model(candidate)
+            model_pinned = bool(version) if pin is None else pin
+            model_reload_status.update(state="idle", version=candidate.version)
+            app.logger.info(f"Serving model version {candidate.version}")
+            return candidate
+        except Exception as e:
+            model_reload_status.update(state="failed", error=str(e))
+            app.logger.error(f"Model reload failed: {e}")
+            raise
+        finally:
+            model_reload_status["finished_at"] = datetime.utcnow().isoformat()
+
+
+def reload_model_async(version=None) -> None:
+    def run():
+        try:
+            reload_model(version)
+        except Exception:
+            pass  # recorded in model_reload_status
+    threading.Thread(target=run, name="model-reload", daemon=True).start()
+
+
+def rollback_model() -> bool:
+    """Swap back to the previously served version, which is still in memory."""
+    global model_pinned
+    with model_reload_lock:
+        if previous_model is None:
+            return False
+        set_model(previous_model)
+        model_pinned = True
+        return True
+
+
+def watch_model_store(interval: float) -> None:
+    """Poll model_store and hot-load new versions as train_model.py publishes them.
+
+    Every gunicorn worker runs its own watcher, which is how a retrain reaches
+    all workers without a restart (the admin endpoints only reach one).
+    """
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                latest = model_store.latest_version()
+                current = serving_model.version if serving_model is not None else None
+                if latest and latest != current and not model_pinned:
+                    reload_model(latest, pin=False)
+            except Exception as e:
+                app.logger.error(f"Model watcher error: {e}")
+    threading.Thread(target=run, name="model-watcher", daemon=True).start()
+
+
+if app.config["MODEL_WATCH_INTERVAL"] > 0:
+    watch_model_store(app.config["MODEL_WATCH_INTERVAL"])
+
+
+# ======================================================
+# INCREMENTAL TRAINING
+# ======================================================
+
+incremental_lock = threading.Lock()
+incremental_status = {"state": "idle", "version": None, "error": None, "finished_at": None}
+
+
+def run_incremental_training(mode=None, include_predictions=None):
+    """Update the serving model from new database rows and load the result.
+
+    Publishes to model_store like train_model.py, so other workers pick the
+    version up through their watcher. Needs an app context.
+    """
+    import incremental_training
+
+    if not incremental_lock.acquire(blocking=False):
+        raise RuntimeError("Incremental training already running")
+    try:
+        incremental_status.update(state="training", error=None)
+        serving = serving_model
+        if serving is None:
+            raise RuntimeError("No serving model to update")
+        base = serving.pipeline.get() if isinstance(serving.pipeline, model_store.LazyPipeline) else serving.pipeline
+        version = incremental_training.run_incremental_update(
+            base,
+            dict(serving.meta, version=serving.version),
+            mode=mode or app.config["INCREMENTAL_MODE"],
+            include_predictions=(app.config["INCREMENTAL_INCLUDE_PREDICTIONS"]
+                                 if include_predictions is None else include_predictions),
+            trees_per_update=app.config["INCREMENTAL_TREES"],
+            max_trees=app.config["INCREMENTAL_MAX_TREES"],
+            window_rows=app.config["INCREMENTAL_WINDOW_ROWS"],
+            min_rows=app.config["INCREMENTAL_MIN_ROWS"],
+        )
+        if version is not None:
+            reload_model(version, pin=False)
+        incremental_status.update(state="idle", version=version)
+        return version
+    except Exception as e:
+        incremental_status.update(state="failed", error=str(e))
+        app.logger.error(f"Incremental training failed: {e}")
+        raise
+    finally:
+        incremental_status["finished_at"] = datetime.utcnow().isoformat()
+        incremental_lock.release()
+
+
+def run_incremental_training_async(mode=None, include_predictions=None) -> None:
+    def run():
+        with app.app_context():
+            try:
+                run_incremental_training(mode, include_predictions)
+            except Exception:
+                pass  # recorded in incremental_status
+    threading.Thread(target=run, name="incremental-training", daemon=True).start()
 
 # ======================================================
 # LOGIN MANAGER
@@ -267,6 +709,16 @@ def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_IMAGE_EXTENSIONS
 
 
+def apply_prediction_choices(form, meta) -> None:
+    """Point PredictRentForm's SelectFields at the precomputed option lists."""
+    form.city.choices = meta.city_choices
+    form.furnishing_status.choices = meta.furnishing_choices
+    form.tenant_preferred.choices = meta.tenant_choices
+    form.area_type.choices = meta.area_type_choices
+    if hasattr(form, "area_locality"):
+        form.area_locality.choices = meta.locality_choices
+
+
 def send_reset_email(user):
     token = user.get_reset_token()
     msg = Message("Password Reset Request", recipients=[user.email])
@@ -316,20 +768,10 @@ def infer_built_type(bedrooms, bathrooms, area_type):
         return "Villa"
     return "Apartment"
 
-def derive_pid_from_row(row: dict) -> str:
-    try:
-        import hashlib
-        base = f"{row.get('City','')}-{row.get('BHK','')}-{row.get('Bathroom','')}-{row.get('Size','')}-{row.get('Rent','')}"
-        digest = hashlib.md5(base.encode('utf-8')).hexdigest()
-        num = int(digest[:8], 16) % 100000000
-        return f"TH{str(num).zfill(8)}"
-    except Exception:
-        return "TH00000000"
-
-
 def enrich_from_dataset(payload: dict) -> dict:
     try:
-        if ui_df is None or ui_df.empty:
+        snapshot = dataset_snapshot
+        if not snapshot.has_rows:
             return payload
         city = str(payload.get("city") or payload.get("location") or "")
         bhk = int(payload.get("bedrooms") or 0)
@@ -337,42 +779,8 @@ def enrich_from_dataset(payload: dict) -> dict:
         size = float(payload.get("area") or payload.get("size") or 0)
         rent = float(payload.get("price") or 0)
 
-        df = ui_df.copy()
-        if city:
-            try:
-                df = df[df["City"].astype(str) == city]
-            except Exception:
-                pass
-        if df.empty:
-            df = ui_df.copy()
-
-        def score(row):
-            s = 0.0
-            try:
-                s += abs(float(row.get("Size", 0) or 0) - size) / 1000.0
-            except Exception:
-                pass
-            try:
-                s += 0.5 * abs(float(row.get("Rent", 0) or 0) - rent) / max(rent or 1.0, 1.0)
-            except Exception:
-                pass
-            try:
-                s += 0.2 * abs(int(row.get("BHK", 0) or 0) - bhk)
-            except Exception:
-                pass
-            try:
-                s += 0.2 * abs(int(row.get("Bathroom", 0) or 0) - bath)
-            except Exception:
-                pass
-            return s
-
-        best_row = None
-        best_score = None
-        for row in df.to_dict("records"):
-            sc = score(row)
-            if best_score is None or sc < best_score:
-                best_score = sc
-                best_row = row
+        # Same scoring as the old per-row loop, vectorized per city
+        best_row = snapshot.nearest_index.nearest(city, size, rent, bhk, bath)
 
         if best_row:
             payload.setdefault("area_type", str(best_row.get("Area Type", "")))
@@ -414,30 +822,12 @@ def handle_vite_client():
 
 @app.route("/")
 def index():
-    featured = []
-    home_cities = []
-    popular_cities = []
-    property_types = []
-
-    if ui_df is not None and not ui_df.empty:
-        df = ui_df.copy()
-
-        # Featured properties
-        featured = df.sample(min(6, len(df))).to_dict("records")
-
-        # Cities and counts
-        if "City" in df.columns:
-            city_counts = df["City"].dropna().astype(str).value_counts()
-            home_cities = [{"name": c, "count": int(n)} for c, n in city_counts.items()]
-            popular_cities = [{"name": c, "count": int(n)} for c, n in city_counts.head(40).items()]
-
-        # Property types from built type (derived), not area type
-        try:
-            bt_series = df.apply(lambda r: infer_built_type(r.get("BHK"), r.get("Bathroom"), r.get("Area Type")), axis=1)
-            bt_counts = bt_series.dropna().astype(str).value_counts()
-            property_types = [{"name": name, "count": int(cnt)} for name, cnt in bt_counts.items()]
-        except Exception:
-            property_types = []
+    # Aggregates are built once per dataset snapshot (load_ui_dataset)
+    summary = dataset_snapshot.home_summary
+    featured = summary.featured(6)
+    home_cities = list(summary.home_cities)
+    popular_cities = list(summary.popular_cities)
+    property_types = list(summary.property_types)
 
     return render_template(
         "index.html",
@@ -463,10 +853,8 @@ def contact():
     return render_template("contact.html")
 
 
-@app.route("/listing")
-def listing():
-    import random
-
+def listing_items(snapshot=None):
+    """Card dicts for every listing: Property rows, or the UI dataset when there are none."""
     db_props = Property.query.order_by(Property.created_at.desc()).all()
 
     properties = []
@@ -494,17 +882,22 @@ def listing():
             })
     else:
         # Fallback to dataset if DB has no properties
-        ds = ui_df.to_dict("records") if (ui_df is not None and not ui_df.empty) else []
+        if snapshot is None:
+            snapshot = dataset_snapshot
+        ds = snapshot.frame.to_dict("records") if snapshot.has_rows else []
 
         image_dir = os.path.join(BASE_DIR, "Frontend", "assets", "img", "property")
         image_files = []
         if os.path.isdir(image_dir):
-            image_files = [
+            image_files = sorted(
                 f for f in os.listdir(image_dir)
                 if os.path.isfile(os.path.join(image_dir, f))
-            ]
+            )
+        # Resolved once; each row gets a fixed picture so cached payloads are
+        # identical across rebuilds and workers (strong ETags)
+        image_urls = [url_for("static", filename=f"img/property/{f}") for f in image_files]
 
-        for row in ds:
+        for position, row in enumerate(ds):
             properties.append({
                 "id": None,
                 "title": f"{int(row.get('BHK', 0))}-BHK in {row.get('City', '')}",
@@ -523,13 +916,189 @@ def listing():
                 "contact": str(row.get("Point of Contact", "")),
                 "pid": str(row.get("Property ID") or row.get("Property_ID") or row.get("Post ID") or derive_pid_from_row(row)),
                 "created_at": "",
-                "image_url": (
-                    url_for("static", filename=f"img/property/{random.choice(image_files)}")
-                    if image_files else None
-                ),
+                "image_url": image_urls[position % len(image_urls)] if image_urls else None,
             })
 
-    return render_template("listing.html", properties=properties)
+    return properties
+
+
+# Catalog of listing cards for /api/listings, rebuilt when the inventory changes
+listing_catalog_lock = threading.Lock()
+listing_catalog = (None, EMPTY_CATALOG)   # (inventory key, ListingCatalog)
+
+
+def inventory_key(snapshot=None):
+    """Changes whenever a Property is added, edited or removed, or the dataset changes.
+
+    Built from the database and the dataset's content fingerprint, so every
+    worker computes the same key for the same inventory.
+    """
+    count, last_update = db.session.query(func.count(Property.id), func.max(Property.updated_at)).one()
+    if snapshot is None:
+        snapshot = dataset_snapshot
+    return snapshot.stats.get("version"), count, last_update
+
+
+def get_listing_catalog() -> ListingCatalog:
+    global listing_catalog
+    snapshot = dataset_snapshot
+    key = inventory_key(snapshot)
+    cached_key, catalog = listing_catalog
+    if cached_key == key:
+        return catalog
+    with listing_catalog_lock:
+        cached_key, catalog = listing_catalog
+        if cached_key != key:
+            catalog = ListingCatalog(listing_items(snapshot))
+            listing_catalog = (key, catalog)
+    return catalog
+
+
+# Serialized /listing and /api/listings bodies with their ETags; the
+# generation is bumped by invalidate_listings()
+listing_payload_cache = PredictionCache(max_entries=app.config["LISTING_CACHE_SIZE"])
+
+
+def invalidate_listings() -> None:
+    """Drop the catalog and cached payloads after a Property write."""
+    global listing_catalog
+    with listing_catalog_lock:
+        listing_catalog = (None, EMPTY_CATALOG)
+    listing_payload_cache.invalidate()
+
+
+def cached_listing_response(name: str, build, mimetype: str):
+    """Serve ``build()`` from ``listing_payload_cache`` with a strong ETag.
+
+    Entries are keyed on the inventory and the query string. ``build``
+    returns the body, or a Response (an error) that is sent uncached. A
+    request whose If-None-Match holds the current ETag gets a bare 304.
+    """
+    generation = listing_payload_cache.generation
+    key = (name, inventory_key(), request.query_string)
+    entry = listing_payload_cache.get(key, generation)
+    if entry is None:
+        body = build()
+        if not isinstance(body, (str, bytes)):
+            return body
+        body = body.encode("utf-8") if isinstance(body, str) else body
+        entry = (body, hashlib.sha256(body).hexdigest()[:32])
+        listing_payload_cache.put(key, entry, generation)
+    body, etag = entry
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype=mimetype)
+    response.set_etag(etag)
+    # Browsers keep the copy but revalidate it on every visit
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+# Autocomplete index over the dataset and the Property table. Property writes
+# made by this worker are applied in place; any other change rebuilds it.
+search_index_lock = threading.Lock()
+search_index = SearchIndex()
+
+
+def get_search_index() -> SearchIndex:
+    global search_index
+    snapshot = dataset_snapshot
+    key = inventory_key(snapshot)
+    if search_index.key == key:
+        return search_index
+    with search_index_lock:
+        if search_index.key != key:
+            index = build_search_index(snapshot.frame, Property.query.all())
+            index.key = key
+            search_index = index
+    return search_index
+
+
+def update_search_index(apply, count_delta: int, updated_at=None) -> None:
+    """Apply one committed Property write to the search index in place.
+
+    The index stays current only if nothing else changed the inventory, so
+    the new inventory key is compared with the one this write alone gives.
+    When another worker wrote too, the key is cleared and the next lookup
+    rebuilds.
+    """
+    with search_index_lock:
+        index = search_index
+        if index.key is None:
+            return
+        fingerprint, count, last_update = index.key
+        apply(index)
+        stamps = [t for t in (last_update, updated_at) if t is not None]
+        expected = (fingerprint, count + count_delta, max(stamps) if stamps else None)
+        index.key = expected if inventory_key() == expected else None
+
+
+def index_property(prop, created: bool = False) -> None:
+    update_search_index(lambda index: index.upsert_property(prop), 1 if created else 0, prop.updated_at)
+
+
+def unindex_property(property_id) -> None:
+    update_search_index(lambda index: index.remove_property(property_id), -1)
+
+
+@app.route("/listing")
+def listing():
+    # Only the filter options and the count; cards are fetched from /api/listings
+    def build():
+        catalog = get_listing_catalog()
+        return render_template("listing.html", facets=catalog.facets(), total_properties=len(catalog))
+    return cached_listing_response("listing", build, "text/html")
+
+
+@app.route("/api/listings", methods=["GET"])
+def listings_api():
+    """One page of listings, filtered and sorted on the server.
+
+    Query parameters: q, city, category, furnishing, tenant, min_price,
+    max_price, beds, baths (``3`` or ``5+``), sort (recent, price_asc,
+    price_desc, newest), limit and the ``next_cursor`` of the previous page.
+    """
+    def build():
+        query, errors = parse_listing_query(request.args)
+        try:
+            limit = int(request.args.get("limit") or DEFAULT_PAGE_SIZE)
+        except ValueError:
+            errors["limit"] = "Expected a number"
+        if errors:
+            return jsonify({"error": "Invalid query", "errors": errors}), 400
+        try:
+            page = get_listing_catalog().query(query, cursor=request.args.get("cursor"), limit=limit)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return app.json.dumps(page)
+    return cached_listing_response("api", build, "application/json")
+
+
+@app.route("/api/search/suggest", methods=["GET"])
+def search_suggest_api():
+    """Autocomplete suggestions for ``q`` (word prefixes, e.g. ``ban kor``).
+
+    Optional ``type`` (comma separated: city, locality, property) and
+    ``limit``. Property suggestions carry the URL of their detail page.
+    """
+    q = (request.args.get("q") or "").strip()
+    kinds = [kind for kind in (request.args.get("type") or "").split(",") if kind]
+    errors = {}
+    if any(kind not in SEARCH_KINDS for kind in kinds):
+        errors["type"] = f"Expected any of {', '.join(SEARCH_KINDS)}"
+    try:
+        limit = int(request.args.get("limit") or DEFAULT_SUGGESTIONS)
+    except ValueError:
+        errors["limit"] = "Expected a number"
+    if errors:
+        return jsonify({"error": "Invalid query", "errors": errors}), 400
+    suggestions = get_search_index().search(q, limit=limit, kinds=kinds or None) if q else []
+    for suggestion in suggestions:
+        if suggestion["type"] == "property":
+            suggestion["url"] = url_for("property_detail", property_id=suggestion["id"])
+    return jsonify({"query": q, "suggestions": suggestions})
+
 
 
  
@@ -565,18 +1134,14 @@ def property_preview():
     featured = []
     try:
         import random
-        ds = ui_df.to_dict("records") if (ui_df is not None and not ui_df.empty) else []
-        city = property_payload["city"]
-        pool = [r for r in ds if (city and str(r.get("City",""))==city)] or ds
-        for row in pool[:3]:
-            title = f"{int(row.get('BHK',0))}-BHK in {row.get('City','')}"
-            url = url_for("property_preview", title=title, price=float(row.get("Rent",0) or 0), bedrooms=int(row.get("BHK",0) or 0), bathrooms=int(row.get("Bathroom",0) or 0), area=float(row.get("Size",0) or 0), category=str(row.get("Area Type","")), address=str(row.get("Address","")), city=str(row.get("City","")), furnishing_status=str(row.get("Furnishing Status","")), tenant_preferred=str(row.get("Tenant Preferred","")), pid=str(row.get("Property ID") or row.get("Property_ID") or derive_pid_from_row(row)), area_type=str(row.get("Area Type","")), locality=str(row.get("Area Locality","")), contact=str(row.get("Point of Contact","")))
+        base_url = url_for("property_preview")
+        for card in dataset_snapshot.preview_pools.featured(property_payload["city"], k=3):
             featured.append({
-                "title": title,
-                "city": str(row.get("City","")),
-                "price": float(row.get("Rent",0) or 0),
+                "title": card["title"],
+                "city": card["city"],
+                "price": card["price"],
                 "image_url": url_for("serve_assets", filename=f"img/property/featured-grid{random.randint(1,6)}.jpg"),
-                "url": url,
+                "url": f"{base_url}?{card['query']}",
             })
     except Exception:
         pass
@@ -591,81 +1156,63 @@ def rent_prediction():
     form = PredictRentForm()
     prediction_result = None
 
-    # Dynamic options from dataset for dropdowns
-    city_options = []
-    furnishing_options = []
-    tenant_options = []
-    area_type_options = []
-    contact_options = []
-    localities_by_city = {}
-
-    if ui_df is not None and not ui_df.empty:
-        try:
-            city_options = sorted(set(ui_df["City"].dropna().astype(str).tolist()))
-        except Exception:
-            city_options = []
-        try:
-            furnishing_options = sorted(set(ui_df["Furnishing Status"].dropna().astype(str).tolist()))
-        except Exception:
-            furnishing_options = ["Unfurnished", "Semi-Furnished", "Furnished"]
-        try:
-            tenant_options = sorted(set(ui_df["Tenant Preferred"].dropna().astype(str).tolist()))
-        except Exception:
-            tenant_options = ["Bachelors", "Family", "Bachelors/Family"]
-        try:
-            area_type_options = sorted(set(ui_df["Area Type"].dropna().astype(str).tolist()))
-        except Exception:
-            area_type_options = ["Super Area", "Carpet Area", "Built Area", "Plot Area"]
-        try:
-            contact_options = sorted(set(ui_df["Point of Contact"].dropna().astype(str).tolist()))
-        except Exception:
-            contact_options = ["Contact Owner", "Contact Agent", "Contact Builder"]
-        try:
-            if "Area Locality" in ui_df.columns:
-                for city, sub in ui_df.groupby("City"):
-                    localities_by_city[str(city)] = sorted(set(sub["Area Locality"].dropna().astype(str).tolist()))
-        except Exception:
-            localities_by_city = {}
-
-    # Set choices for validation
-    form.city.choices = [(c, c) for c in city_options]
-    form.furnishing_status.choices = [(f, f) for f in furnishing_options]
-    form.tenant_preferred.choices = [(t, t) for t in tenant_options]
-    form.area_type.choices = [(a, a) for a in area_type_options]
+    # Dropdown options come from the metadata built at dataset load
+    meta = dataset_snapshot.meta
+    apply_prediction_choices(form, meta)
 
     if form.validate_on_submit():
-        if model is None:
+        if serving_model is None:
             flash("Prediction model is not available.", "danger")
         else:
             try:
                 # Use field names consistent with your original PredictRentForm
-                data = {
-                    "Size": [form.size.data],
-                    "BHK": [form.bhk.data],
-                    "Bathroom": [form.bathroom.data],
-                    "City": [form.city.data],
-                    "Furnishing Status": [form.furnishing_status.data],
-                    "Tenant Preferred": [form.tenant_preferred.data],
-                    "Area Type": [form.area_type.data],
-                }
-                input_df = pd.DataFrame(data)
-                predicted = model.predict(input_df)[0]
+                row = (
+                    form.size.data,
+                    form.bhk.data,
+                    form.bathroom.data,
+                    form.city.data,
+                    form.furnishing_status.data,
+                    form.tenant_preferred.data,
+                    form.area_type.data,
+                )
+                predicted = predict_rents([row], batched=True)[0]
                 prediction_result = f"₹{predicted:,.0f}"
             except Exception as e:
                 app.logger.error(f"Prediction error: {e}")
                 flash("An error occurred during prediction. Please try again.", "danger")
 
-    return render_template(
+    # Options are fetched from the content-hashed /api/prediction-options URL
+    response = make_response(render_template(
         "rent-prediction.html",
         form=form,
         prediction_result=prediction_result,
-        city_options=city_options,
-        furnishing_options=furnishing_options,
-        tenant_options=tenant_options,
-        area_type_options=area_type_options,
-        contact_options=contact_options,
-        localities_by_city=localities_by_city,
-    )
+        options_version=meta.options_version,
+    ))
+    if request.method == "GET":
+        # Same markup for the same session and dataset: revalidate, don't refetch
+        response.add_etag()
+        response.headers["Cache-Control"] = "private, no-cache"
+        response = response.make_conditional(request)
+    return response
+
+
+@app.route("/api/prediction-options/<version>.json", methods=["GET"])
+def prediction_options_api(version):
+    """Dropdown options and localities per city for rent-prediction.html.
+
+    ``version`` is the content hash of the body, so a URL's response never
+    changes and browsers may keep it for PREDICTION_OPTIONS_MAX_AGE. An old
+    hash (the dataset was reloaded) redirects to the current one.
+    """
+    meta = dataset_snapshot.meta
+    if version != meta.options_version:
+        response = redirect(url_for("prediction_options_api", version=meta.options_version))
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+    response = app.response_class(meta.options_json, mimetype="application/json")
+    response.set_etag(meta.options_version)
+    response.headers["Cache-Control"] = f"public, max-age={app.config['PREDICTION_OPTIONS_MAX_AGE']}, immutable"
+    return response.make_conditional(request)
 
 # ======================================================
 # Legacy .html URL mappings (for static template links)
@@ -707,88 +1254,227 @@ def legacy_html(page):
 @app.route("/predict_rent", methods=["POST"])
 @csrf.exempt  # if called from JS without CSRF token
 def predict_rent_api():
-    if model is None:
+    serving = serving_model
+    if serving is None:
         return jsonify({"error": "Model not available"}), 500
 
     data = request.get_json() or {}
     form = PredictRentForm(meta={'csrf': False}, data=data)
-
-    # Prepare choices for SelectFields
-    if ui_df is not None and not ui_df.empty:
-        city_options = sorted(set(ui_df["City"].dropna().astype(str).tolist()))
-        furnishing_options = sorted(set(ui_df["Furnishing Status"].dropna().astype(str).tolist()))
-        tenant_options = sorted(set(ui_df["Tenant Preferred"].dropna().astype(str).tolist()))
-        area_type_options = sorted(set(ui_df["Area Type"].dropna().astype(str).tolist()))
-    else:
-        city_options = []
-        furnishing_options = ["Unfurnished", "Semi-Furnished", "Furnished"]
-        tenant_options = ["Bachelors", "Family", "Bachelors/Family"]
-        area_type_options = ["Super Area", "Carpet Area", "Built Area", "Plot Area"]
-
-    form.city.choices = [(c, c) for c in city_options]
-    form.furnishing_status.choices = [(f, f) for f in furnishing_options]
-    form.tenant_preferred.choices = [(t, t) for t in tenant_options]
-    form.area_type.choices = [(a, a) for a in area_type_options]
-
-    if ui_df is not None and not ui_df.empty:
-        city_options = sorted(set(ui_df["City"].dropna().astype(str).tolist()))
-        furnishing_options = sorted(set(ui_df["Furnishing Status"].dropna().astype(str).tolist()))
-        tenant_options = sorted(set(ui_df["Tenant Preferred"].dropna().astype(str).tolist()))
-        area_type_options = sorted(set(ui_df["Area Type"].dropna().astype(str).tolist()))
-        # Area locality choices union for validation (optional)
-        try:
-            all_localities = sorted(set(ui_df["Area Locality"].dropna().astype(str).tolist()))
-        except Exception:
-            all_localities = []
-    else:
-        city_options = []
-        furnishing_options = ["Unfurnished", "Semi-Furnished", "Furnished"]
-        tenant_options = ["Bachelors", "Family", "Bachelors/Family"]
-        area_type_options = ["Super Area", "Carpet Area", "Built Area", "Plot Area"]
-        all_localities = []
-
-    form.city.choices = [(c, c) for c in city_options]
-    form.furnishing_status.choices = [(f, f) for f in furnishing_options]
-    form.tenant_preferred.choices = [(t, t) for t in tenant_options]
-    form.area_type.choices = [(a, a) for a in area_type_options]
-    if hasattr(form, 'area_locality'):
-        form.area_locality.choices = [(l, l) for l in all_localities]
+    snapshot = dataset_snapshot
+    apply_prediction_choices(form, snapshot.meta)
 
     if not form.validate():
         return jsonify({"error": "Invalid form submission", "errors": form.errors}), 400
 
     try:
-        input_df = pd.DataFrame({
-            "Size": [form.size.data],
-            "BHK": [form.bhk.data],
-            "Bathroom": [form.bathroom.data],
-            "City": [form.city.data],
-            "Furnishing Status": [form.furnishing_status.data],
-            "Tenant Preferred": [form.tenant_preferred.data],
-            "Area Type": [form.area_type.data],
-        })
-        predicted = model.predict(input_df)[0]
-
-        matching_properties = []
-        if ui_df is not None and not ui_df.empty and "Rent" in ui_df.columns:
-            min_price = predicted * 0.9
-            max_price = predicted * 1.1
-            df_match = ui_df[
-                (ui_df["Rent"] >= min_price) & (ui_df["Rent"] <= max_price)
-            ]
-            if form.city.data and form.city.data != "Any":
-                df_match = df_match[df_match["City"] == form.city.data]
-            matching_properties = df_match.head(50).to_dict("records")
+        row = (
+            form.size.data,
+            form.bhk.data,
+            form.bathroom.data,
+            form.city.data,
+            form.furnishing_status.data,
+            form.tenant_preferred.data,
+            form.area_type.data,
+        )
+        predicted = predict_rents([row], serving=serving, batched=True)[0]
+
+        city = form.city.data if form.city.data and form.city.data != "Any" else None
+        matching_properties = snapshot.rent_index.records(predicted * 0.9, predicted * 1.1, city, limit=50)
 
         return jsonify({
             "predicted_rent": f"{predicted:.2f}",
             "matching_properties": matching_properties,
+            "model_version": serving.version,
+            "model_shard": form.city.data if form.city.data in serving.shards else None,
         })
     except Exception as e:
         app.logger.error(f"Prediction API error: {e}")
         return jsonify({"error": "Internal error"}), 500
 
 
+# ======================================================
+# BATCH PREDICTION (API)
+# ======================================================
+
+# Accepted JSON keys / CSV headers per feature: PredictRentForm names first,
+# then the dataset column names so exported CSVs can be posted as-is.
+BATCH_FIELD_ALIASES = {
+    "Size": ("size", "Size"),
+    "BHK": ("bhk", "BHK"),
+    "Bathroom": ("bathroom", "Bathroom"),
+    "City": ("city", "City"),
+    "Furnishing Status": ("furnishing_status", "Furnishing Status"),
+    "Tenant Preferred": ("tenant_preferred", "Tenant Preferred"),
+    "Area Type": ("area_type", "Area Type"),
+}
+
+BATCH_CHUNK_ROWS = 5000
+BATCH_MAX_CONTENT_LENGTH = 512 * 1024 * 1024  # 512MB, CSV uploads only
+
+
+def _batch_column(frame, feature):
+    column = pd.Series([None] * len(frame), index=frame.index, dtype=object)
+    for name in BATCH_FIELD_ALIASES[feature]:
+        if name in frame.columns:
+            column = column.fillna(frame[name])
+    return column
+
+
+def validate_prediction_frame(frame, options):
+    """Validate a chunk of raw rows the same way PredictRentForm does.
+
+    Returns ``(clean, errors)``: ``clean`` holds the valid rows with the model
+    feature columns, ``errors`` maps a row index to ``{field: [messages]}``.
+    """
+    clean = pd.DataFrame(index=frame.index)
+    failures = []
+
+    numeric_rules = [
+        ("Size", "size", False, 100, 10000, "Size must be between 100 and 10000 sqft"),
+        ("BHK", "bhk", True, 1, 10, "Number of bedrooms must be between 1 and 10"),
+        ("Bathroom", "bathroom", True, 1, 10, "Number of bathrooms must be between 1 and 10"),
+    ]
+    for feature, field, integer, low, high, message in numeric_rules:
+        raw = _batch_column(frame, feature)
+        values = pd.to_numeric(raw, errors="coerce")
+        missing = raw.isna() | (raw.astype(str).str.strip() == "")
+        invalid = values.isna() & ~missing
+        if integer:
+            invalid |= values.notna() & (values % 1 != 0)
+        out_of_range = ~missing & ~invalid & ((values < low) | (values > high))
+        invalid_message = "Not a valid integer value." if integer else "Not a valid float value."
+        failures.append((field, missing, "This field is required."))
+        failures.append((field, invalid, invalid_message))
+        failures.append((field, out_of_range, message))
+        clean[feature] = values
+
+    categorical_fields = {
+        "City": "city",
+        "Furnishing Status": "furnishing_status",
+        "Tenant Preferred": "tenant_preferred",
+        "Area Type": "area_type",
+    }
+    for feature, field in categorical_fields.items():
+        raw = _batch_column(frame, feature)
+        values = raw.where(raw.notna(), "").astype(str)
+        # SelectField + Optional(): blank is accepted, anything else must be a choice
+        invalid = (values != "") & ~values.isin(options[feature])
+        failures.append((field, invalid, "Not a valid choice."))
+        clean[feature] = values
+
+    errors = {}
+    for field, mask, message in failures:
+        for idx in mask[mask].index:
+            errors.setdefault(idx, {}).setdefault(field, []).append(message)
+
+    clean = clean.drop(index=list(errors))
+    clean = clean.astype({"BHK": "int64", "Bathroom": "int64"})
+    return clean[PREDICTION_FEATURES], errors
+
+
+def predict_frame_chunk(frame, offset, options, serving):
+    """Validate and price one chunk with a single vectorized predict call."""
+    frame = frame.reset_index(drop=True)
+    frame.index = frame.index + offset
+    frame.columns = frame.columns.str.strip()
+    clean, errors = validate_prediction_frame(frame, options)
+    predictions = {}
+    if not clean.empty:
+        # Bulk re-pricing would only churn the interactive cache, so bypass it
+        for idx, value in zip(clean.index, predict_rents(clean.itertuples(index=False, name=None), use_cache=False, serving=serving)):
+            predictions[idx] = f"{value:.2f}"
+    results = []
+    for idx in frame.index:
+        if idx in predictions:
+            results.append({"row": int(idx), "predicted_rent": predictions[idx]})
+        else:
+            results.append({"row": int(idx), "errors": errors.get(idx, {})})
+    return results
+
+
+@app.route("/predict_rent/batch", methods=["POST"])
+@csrf.exempt  # called from scripts / nightly jobs
+def predict_rent_batch_api():
+    """Price many properties per request.
+
+    Accepts either a JSON array of objects (or ``{"rows": [...]}``) using the
+    same keys as ``/predict_rent``, or a CSV upload in the ``file`` field with
+    the dataset column names. CSV uploads are read and priced in chunks of
+    ``BATCH_CHUNK_ROWS`` and the results are streamed back as they are ready.
+    Invalid rows are reported individually and do not fail the batch.
+    """
+    # One version prices the whole batch, even if a reload lands mid-stream
+    serving = serving_model
+    if serving is None:
+        return jsonify({"error": "Model not available"}), 500
+
+    # Nightly re-pricing files are much larger than image uploads
+    request.max_content_length = BATCH_MAX_CONTENT_LENGTH
+    options = dataset_snapshot.meta.valid
+
+    upload = request.files.get("file")
+    if upload is not None and upload.filename:
+        # The upload is closed with the request context, before the streamed
+        # body is produced, so spool it to a temp file the generator owns.
+        spool = tempfile.TemporaryFile()
+        shutil.copyfileobj(upload.stream, spool)
+        spool.seek(0)
+        try:
+            reader = pd.read_csv(spool, chunksize=BATCH_CHUNK_ROWS, dtype=str)
+            first_chunk = next(reader, None)
+        except Exception as e:
+            spool.close()
+            app.logger.error(f"Batch CSV parse error: {e}")
+            return jsonify({"error": "Could not parse CSV upload"}), 400
+        if first_chunk is None:
+            spool.close()
+            return jsonify({"error": "CSV upload has no rows"}), 400
+
+        def chunks():
+            try:
+                yield first_chunk
+                yield from reader
+            finally:
+                spool.close()
+    else:
+        payload = request.get_json(silent=True)
+        rows = payload.get("rows") if isinstance(payload, dict) else payload
+        if not isinstance(rows, list):
+            return jsonify({"error": "Expected a JSON array of rows or a CSV file upload"}), 400
+        # Non-object entries become empty rows and fail validation on their own
+        frame = pd.DataFrame([row if isinstance(row, dict) else {} for row in rows], index=range(len(rows)))
+
+        def chunks():
+            for start in range(0, len(frame), BATCH_CHUNK_ROWS):
+                yield frame.iloc[start:start + BATCH_CHUNK_ROWS]
+
+    def generate():
+        total = predicted = 0
+        first = True
+        yield '{"results": ['
+        try:
+            for chunk in chunks():
+                for result in predict_frame_chunk(chunk, total, options, serving):
+                    predicted += "predicted_rent" in result
+                    yield ("" if first else ",") + json.dumps(result)
+                    first = False
+                total += len(chunk)
+            status = "ok"
+        except Exception as e:
+            # Headers are already sent; report the failure in the summary instead
+            app.logger.error(f"Batch prediction error: {e}")
+            status = "error"
+        yield "], " + json.dumps({"summary": {
+            "status": status,
+            "rows": total,
+            "predicted": predicted,
+            "failed": total - predicted,
+            "model_version": serving.version,
+        }})[1:]
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
 # ======================================================
 # DATASET IMPORT
 # ======================================================
@@ -823,6 +1509,7 @@ def import_properties_from_df(df, limit: int = 500):
         except Exception:
             db.session.rollback()
     db.session.commit()
+    invalidate_listings()
     return count
 
 
@@ -837,14 +1524,104 @@ def admin_import_dataset():
     if not filename or not os.path.exists(filename):
         flash("Dataset file not found", "danger")
         return redirect(url_for("admin_dashboard"))
-    load_ui_dataset(filename)
-    flash("UI dataset loaded", "success")
-    if ui_df is not None and to_db:
-        imported = import_properties_from_df(ui_df)
-        flash(f"Imported {imported} properties into the database", "success")
+    # Built on a background thread; requests keep the current snapshot until it is ready
+    load_ui_dataset_async(filename, to_db=to_db)
+    if to_db:
+        flash("UI dataset is reloading; its rows will be imported into the database when it is ready", "info")
+    else:
+        flash("UI dataset is reloading in the background", "info")
     return redirect(url_for("admin_dashboard"))
 
 
+@app.route("/admin/model", methods=["GET"])
+@login_required
+def admin_model_status():
+    if current_user.role != "admin":
+        return jsonify({"error": "Not authorized"}), 403
+    current, previous = serving_model, previous_model
+    return jsonify({
+        "active": current.version if current else None,
+        "active_meta": current.meta if current else None,
+        "loaded_at": current.loaded_at if current else None,
+        "previous": previous.version if previous else None,
+        "lookup_coverage": current.lookup.coverage if current and current.lookup is not None else None,
+        "city_shards": sorted(current.shards) if current else [],
+        "pinned": model_pinned,
+        "available": model_store.list_versions(),
+        "reload": dict(model_reload_status),
+    })
+
+
+@app.route("/admin/dataset", methods=["GET"])
+@login_required
+def admin_dataset_status():
+    """Load time and memory of the UI dataset; ``?compare=1`` also times an untyped CSV read."""
+    if current_user.role != "admin":
+        return jsonify({"error": "Not authorized"}), 403
+    snapshot = dataset_snapshot
+    stats = dict(snapshot.stats)
+    stats["snapshot_version"] = snapshot.version
+    stats["reload"] = dict(dataset_reload_status)
+    if request.args.get("compare") and stats.get("source") and os.path.exists(stats["source"]):
+        untyped = measure_untyped_load(stats["source"])
+        stats["untyped"] = untyped
+        stats["memory_ratio"] = untyped["memory_bytes"] / max(stats["memory_bytes"], 1)
+        stats["load_speedup"] = untyped["load_seconds"] / max(stats["load_seconds"], 1e-9)
+    return jsonify(stats)
+
+
+@app.route("/admin/model/reload", methods=["POST"])
+@login_required
+def admin_model_reload():
+    """Load a version (newest by default) in the background and swap it in."""
+    if current_user.role != "admin":
+        return jsonify({"error": "Not authorized"}), 403
+    version = (request.get_json(silent=True) or {}).get("version") or request.values.get("version")
+    if version and version not in model_store.list_versions():
+        return jsonify({"error": f"Unknown model version {version}"}), 404
+    reload_model_async(version)
+    return jsonify({"status": "reloading", "version": version or model_store.latest_version()}), 202
+
+
+@app.route("/admin/model/incremental", methods=["GET", "POST"])
+@login_required
+def admin_model_incremental():
+    """Start an incremental update from new listings (POST) or report on the last one."""
+    if current_user.role != "admin":
+        return jsonify({"error": "Not authorized"}), 403
+    if request.method == "GET":
+        return jsonify(dict(incremental_status))
+    if incremental_lock.locked():
+        return jsonify({"error": "Incremental training already running"}), 409
+    data = request.get_json(silent=True) or {}
+    mode = data.get("mode") or request.values.get("mode")
+    if mode and mode not in ("warm_start", "window"):
+        return jsonify({"error": f"Unknown mode {mode}"}), 400
+    include_predictions = data.get("include_predictions")
+    run_incremental_training_async(mode, None if include_predictions is None else bool(include_predictions))
+    return jsonify({"status": "training", "mode": mode or app.config["INCREMENTAL_MODE"]}), 202
+
+
+@app.route("/admin/model/rollback", methods=["POST"])
+@login_required
+def admin_model_rollback():
+    if current_user.role != "admin":
+        return jsonify({"error": "Not authorized"}), 403
+    if not rollback_model():
+        return jsonify({"error": "No previous model version loaded"}), 409
+    return jsonify({"status": "rolled back", "active": serving_model.version})
+
+
+@app.route("/admin/prediction_cache")
+@login_required
+def admin_prediction_cache():
+    if current_user.role != "admin":
+        return jsonify({"error": "Not authorized"}), 403
+    stats = prediction_cache.stats()
+    stats["batcher"] = prediction_batcher.stats() if prediction_batcher is not None else None
+    return jsonify(stats)
+
+
 # ======================================================
 # AUTH: LOGIN / REGISTER / SIGNUP / LOGOUT
 # ======================================================
@@ -998,10 +1775,17 @@ def customer_dashboard():
 
     if form.validate_on_submit():
         try:
-            if form.location.data:
-                properties_query = properties_query.filter(
-                    Property.city.ilike(f"%{form.location.data}%")
-                )
+            location = (form.location.data or "").strip()
+            if location:
+                # Case-insensitive substring of the city name, resolved to city names
+                # by the index. SearchForm rejects % and _, so the ILIKE fallback
+                # for broad queries matches the same cities.
+                cities = get_search_index().cities(location)
+                if len(cities) <= MAX_FILTER_CITIES:
+                    location_filter = Property.city.in_(cities)
+                else:
+                    location_filter = Property.city.ilike(f"%{location}%")
+                properties_query = properties_query.filter(location_filter)
             if form.min_price.data is not None:
                 properties_query = properties_query.filter(
                     Property.price >= form.min_price.data
@@ -1093,6 +1877,8 @@ def add_property():
         )
         db.session.add(prop)
         db.session.commit()
+        invalidate_listings()
+        index_property(prop, created=True)
         flash("Property added successfully!", "success")
         return redirect(url_for("owner_dashboard"))
     return render_template("owner/create-listing.html", form=form)
@@ -1139,6 +1925,8 @@ def edit_property(property_id):
             prop.image_file = filename
 
         db.session.commit()
+        invalidate_listings()
+        index_property(prop)
         flash("Property updated successfully!", "success")
         return redirect(url_for("owner_dashboard"))
 
@@ -1156,6 +1944,8 @@ def delete_property(property_id):
     Booking.query.filter_by(property_id=prop.id).delete()
     db.session.delete(prop)
     db.session.commit()
+    invalidate_listings()
+    unindex_property(property_id)
     flash("Property deleted successfully", "success")
     return redirect(url_for("owner_dashboard"))
 
@@ -1560,6 +2350,8 @@ def admin_delete_property(property_id):
     Booking.query.filter_by(property_id=prop.id).delete()
     db.session.delete(prop)
     db.session.commit()
+    invalidate_listings()
+    unindex_property(property_id)
     flash("Property deleted successfully", "success")
     return redirect(url_for("admin_properties"))
 
@@ -0,0 +1,130 @@
+"""Nearest-row matching for enrich_from_dataset: old per-row loop vs NearestListingIndex.
+
+Builds frames of ``--rows`` rows (resampled from the UI dataset, with a few
+missing Size/Rent/BHK/Bathroom values), checks that both implementations
+pick the same row for every query and reports per-call latency:
+
+    python bench_enrich.py [--rows 10000 1000000] [--queries 200] [--legacy-queries 20]
+
+The old loop is slow on large frames, so it only runs ``--legacy-queries``
+calls (the first ones of the same query list).
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench_utils import format_row, summarize
+from train_model import DATASET_PATH
+from ui_dataset import NearestListingIndex, apply_ui_schema
+
+
+def legacy_nearest(ui_df, city, size, rent, bhk, bath):
+    """Position of the row the old enrich_from_dataset picked (its code, verbatim)."""
+    df = ui_df.copy()
+    if city:
+        try:
+            df = df[df["City"].astype(str) == city]
+        except Exception:
+            pass
+    if df.empty:
+        df = ui_df.copy()
+
+    def score(row):
+        s = 0.0
+        try:
+            s += abs(float(row.get("Size", 0) or 0) - size) / 1000.0
+        except Exception:
+            pass
+        try:
+            s += 0.5 * abs(float(row.get("Rent", 0) or 0) - rent) / max(rent or 1.0, 1.0)
+        except Exception:
+            pass
+        try:
+            s += 0.2 * abs(int(row.get("BHK", 0) or 0) - bhk)
+        except Exception:
+            pass
+        try:
+            s += 0.2 * abs(int(row.get("Bathroom", 0) or 0) - bath)
+        except Exception:
+            pass
+        return s
+
+    best_position = None
+    best_score = None
+    for position, row in zip(df.index, df.to_dict("records")):
+        sc = score(row)
+        if best_score is None or sc < best_score:
+            best_score = sc
+            best_position = position
+    return best_position
+
+
+def synthetic_frame(n_rows, seed=0):
+    source = pd.read_csv(DATASET_PATH)
+    rng = np.random.default_rng(seed)
+    df = source.sample(n_rows, replace=n_rows > len(source), random_state=seed).reset_index(drop=True)
+    df["Size"] = (df["Size"] * rng.uniform(0.9, 1.1, n_rows)).round()
+    df["Rent"] = (df["Rent"] * rng.uniform(0.9, 1.1, n_rows)).round()
+    # A sprinkling of missing values exercises the NaN rules
+    for column in ("Size", "Rent", "BHK", "Bathroom"):
+        df.loc[rng.random(n_rows) < 0.001, column] = np.nan
+    return apply_ui_schema(df)
+
+
+def make_queries(df, n, seed=1):
+    rng = np.random.default_rng(seed)
+    cities = list(df["City"].astype(str).unique()) + ["", "Atlantis"]
+    queries = []
+    for i in range(n):
+        queries.append((
+            cities[int(rng.integers(len(cities)))],
+            float(rng.integers(300, 4000)),
+            float(rng.integers(0, 60000)) if i % 10 else 0.0,
+            int(rng.integers(0, 6)),
+            int(rng.integers(0, 5)),
+        ))
+    return queries
+
+
+def run(n_rows, n_queries, n_legacy):
+    df = synthetic_frame(n_rows)
+    start = time.perf_counter()
+    index = NearestListingIndex(df)
+    build_ms = (time.perf_counter() - start) * 1000.0
+    queries = make_queries(df, n_queries)
+
+    fast, picks = [], []
+    for query in queries:
+        t0 = time.perf_counter()
+        picks.append(index.nearest_position(*query))
+        fast.append((time.perf_counter() - t0) * 1000.0)
+
+    legacy = []
+    for query, pick in zip(queries[:n_legacy], picks):
+        t0 = time.perf_counter()
+        expected = legacy_nearest(df, *query)
+        legacy.append((time.perf_counter() - t0) * 1000.0)
+        if expected != pick:
+            raise AssertionError(f"Mismatch for {query}: old loop picked {expected}, index picked {pick}")
+
+    print(f"\n{n_rows:,} rows (index built in {build_ms:,.0f} ms, "
+          f"{min(n_legacy, n_queries)} queries checked identical)")
+    print(format_row("old per-row loop", summarize(legacy)))
+    print(format_row("NearestListingIndex", summarize(fast)))
+    print(f"speedup (p50): {np.percentile(legacy, 50) / np.percentile(fast, 50):,.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--legacy-queries", type=int, default=20)
+    args = parser.parse_args()
+    for n_rows in args.rows:
+        run(n_rows, args.queries, args.legacy_queries)
+
+
+if __name__ == "__main__":
+    main()
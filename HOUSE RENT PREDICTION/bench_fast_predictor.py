@@ -0,0 +1,50 @@
+"""Latency of the sklearn pipeline vs. the NumPy fast path.
+
+Run after train_model.py:
+
+    python bench_fast_predictor.py [--repeats 200] [--batch-size 1000]
+"""
+import argparse
+
+import joblib
+import pandas as pd
+
+from bench_utils import format_row, summarize, time_calls
+from fast_predictor import FastForestPredictor, check_parity
+from train_model import DATASET_PATH, FAST_MODEL_PATH, MODEL_PATH, feature_columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    pipeline = joblib.load(MODEL_PATH)
+    fast = FastForestPredictor.load(FAST_MODEL_PATH)
+    df = pd.read_csv(DATASET_PATH)
+    batch = df[feature_columns].sample(args.batch_size, replace=True, random_state=0)
+    rows = list(batch.itertuples(index=False, name=None))
+
+    max_diff = check_parity(pipeline, fast, rows)
+    print(f"Parity on {len(rows)} rows: max abs diff {max_diff:.3g}")
+
+    single_row = rows[:1]
+    single_df = batch.head(1)
+    results = {
+        "sklearn single row": summarize(time_calls(lambda: pipeline.predict(single_df), args.repeats)),
+        # Includes building the one-row DataFrame, as app.py used to do per request
+        "sklearn single row + frame": summarize(time_calls(
+            lambda: pipeline.predict(pd.DataFrame(single_row, columns=feature_columns)), args.repeats)),
+        "fast single row": summarize(time_calls(lambda: fast.predict(single_row), args.repeats)),
+        f"sklearn batch {len(rows)}": summarize(
+            time_calls(lambda: pipeline.predict(batch), max(args.repeats // 10, 5)), len(rows)),
+        f"fast batch {len(rows)}": summarize(
+            time_calls(lambda: fast.predict(rows), max(args.repeats // 10, 5)), len(rows)),
+    }
+    for label, stats in results.items():
+        print(format_row(label, stats))
+
+
+if __name__ == "__main__":
+    main()
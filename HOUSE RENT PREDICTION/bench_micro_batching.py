@@ -0,0 +1,88 @@
+"""Throughput and tail latency of concurrent single-row predictions.
+
+Simulates a gthread worker: ``--threads`` threads each make ``--calls``
+single-row predictions, once calling the model directly and once through
+MicroBatcher. Run after train_model.py:
+
+    python bench_micro_batching.py [--threads 16] [--calls 100] [--window-ms 2] [--max-rows 64] [--fast]
+
+``--fast`` scores with the NumPy fast predictor instead of sklearn.
+"""
+import argparse
+import threading
+import time
+
+import joblib
+import pandas as pd
+
+from bench_utils import format_row, summarize
+from fast_predictor import FastForestPredictor
+from prediction_batcher import MicroBatcher
+from train_model import DATASET_PATH, FAST_MODEL_PATH, MODEL_PATH, feature_columns
+
+
+def run_clients(predict_one, rows, threads, calls):
+    """Return (per-call latencies in ms, wall-clock seconds)."""
+    samples = [[] for _ in range(threads)]
+    start_gate = threading.Barrier(threads + 1)
+
+    def client(i):
+        start_gate.wait()
+        for j in range(calls):
+            row = rows[(i * calls + j) % len(rows)]
+            t0 = time.perf_counter()
+            predict_one(row)
+            samples[i].append((time.perf_counter() - t0) * 1000.0)
+
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    start_gate.wait()
+    t0 = time.perf_counter()
+    for w in workers:
+        w.join()
+    wall = time.perf_counter() - t0
+    return [s for per_thread in samples for s in per_thread], wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-rows", type=int, default=64)
+    parser.add_argument("--fast", action="store_true")
+    args = parser.parse_args()
+
+    if args.fast:
+        model = FastForestPredictor.load(FAST_MODEL_PATH)
+        predict_rows = model.predict
+    else:
+        model = joblib.load(MODEL_PATH)
+        predict_rows = lambda rows: model.predict(pd.DataFrame(rows, columns=feature_columns))  # noqa: E731
+
+    df = pd.read_csv(DATASET_PATH)
+    rows = list(df[feature_columns].sample(1000, random_state=0).itertuples(index=False, name=None))
+    predict_rows(rows[:8])  # warm-up
+
+    batcher = MicroBatcher(lambda batch, _key: predict_rows(batch), args.window_ms, args.max_rows)
+    modes = {
+        "direct": lambda row: predict_rows([row])[0],
+        f"batched {args.window_ms:g}ms/{args.max_rows}": lambda row: batcher.predict([row])[0],
+    }
+
+    total = args.threads * args.calls
+    print(f"{args.threads} threads x {args.calls} calls, {'fast predictor' if args.fast else 'sklearn'}")
+    for label, predict_one in modes.items():
+        samples, wall = run_clients(predict_one, rows, args.threads, args.calls)
+        stats = summarize(samples)
+        # Per-call latency percentiles, but throughput from wall-clock time
+        stats["rows_per_sec"] = total / wall
+        print(format_row(label, stats))
+    if batcher.batches:
+        print(f"batcher: {batcher.rows} rows in {batcher.batches} calls "
+              f"(avg {batcher.rows / batcher.batches:.1f} rows/call)")
+
+
+if __name__ == "__main__":
+    main()
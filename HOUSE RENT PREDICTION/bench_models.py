@@ -0,0 +1,186 @@
+"""Latency, size and accuracy of model variants, written as diffable JSON.
+
+For each variant this reports artifact size, load time, test RMSE/R² and
+p50/p95/p99 latency plus rows/sec for every batch size. ``current`` is the
+deployed house_rent_model.pkl; the other variants are trained on the same
+split of House_Rent_10k_major_cities.csv.
+
+    python bench_models.py [--variants current rf-50 xgb] [--batch-sizes 1 10 100 10000]
+                           [--repeats 200] [--output bench_results/run.json]
+
+Compare two runs with ``diff <(jq . a.json) <(jq . b.json)``.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+from bench_utils import format_row, summarize, time_calls
+from fast_predictor import FastForestPredictor, export_pipeline, save_arrays
+from train_model import (
+    BASE_DIR, DATASET_PATH, MODEL_PATH, build_pipeline, build_preprocessor, evaluate,
+    load_training_data, split_features,
+)
+
+# name -> RandomForestRegressor params (None = the deployed model file)
+FOREST_VARIANTS = {
+    "current": None,
+    "rf-100": {},
+    "rf-50": {"n_estimators": 50},
+    "rf-200": {"n_estimators": 200},
+    "rf-100-depth20": {"max_depth": 20},
+    "rf-100-depth12": {"max_depth": 12},
+}
+XGB_VARIANTS = {
+    "xgb": {"n_estimators": 300, "max_depth": 6, "learning_rate": 0.1},
+    "xgb-depth4": {"n_estimators": 300, "max_depth": 4, "learning_rate": 0.1},
+}
+DEFAULT_VARIANTS = ["current", "rf-50", "rf-100-depth20", "xgb"]
+DEFAULT_OUTPUT_DIR = os.path.join(BASE_DIR, "bench_results")
+
+
+def build_xgb_pipeline(**params):
+    from sklearn.pipeline import Pipeline
+    from xgboost import XGBRegressor
+
+    params = {"n_jobs": -1, "random_state": 42, "tree_method": "hist", **params}
+    return Pipeline(steps=[
+        ("preprocessor", build_preprocessor()),
+        ("model", XGBRegressor(**params)),
+    ])
+
+
+def repeats_for(batch_size, repeats):
+    return max(5, int(repeats / math.sqrt(batch_size)))
+
+
+def time_load(path, loader, repeats=3):
+    samples = time_calls(lambda: loader(path), repeats, warmup=1)
+    return float(np.median(samples))
+
+
+def bench_predict(label, predict, X, batch_sizes, repeats):
+    latency = {}
+    for size in batch_sizes:
+        batch = X.sample(size, replace=size > len(X), random_state=size)
+        stats = summarize(time_calls(lambda: predict(batch), repeats_for(size, repeats)), size)
+        latency[str(size)] = stats
+        print(format_row(f"{label} x{size}", stats))
+    return latency
+
+
+def bench_variant(name, X_train, X_test, y_train, y_test, args, workdir):
+    result = {"name": name}
+    if name == "current":
+        path = MODEL_PATH
+        pipeline = joblib.load(path)
+        result["params"] = "deployed model file"
+    else:
+        if name in XGB_VARIANTS:
+            params = XGB_VARIANTS[name]
+            pipeline = build_xgb_pipeline(**params)
+        else:
+            params = FOREST_VARIANTS[name]
+            pipeline = build_pipeline(**params)
+        result["params"] = params
+        start = time.perf_counter()
+        pipeline.fit(X_train, y_train)
+        result["train_seconds"] = time.perf_counter() - start
+        path = os.path.join(workdir, f"{name}.pkl")
+        joblib.dump(pipeline, path, compress=0)
+
+    rmse, r2 = evaluate(pipeline, X_test, y_test)
+    result.update(
+        rmse=float(rmse),
+        r2=float(r2),
+        artifact_bytes=os.path.getsize(path),
+        load_ms=time_load(path, joblib.load),
+    )
+    print(f"\n{name}: RMSE {rmse:,.2f}  R² {r2:.4f}  "
+          f"{result['artifact_bytes'] / 2**20:.1f} MB  load {result['load_ms']:.0f} ms")
+    result["latency"] = bench_predict(name, pipeline.predict, X_test, args.batch_sizes, args.repeats)
+
+    if args.fast and name not in XGB_VARIANTS:
+        fast_path = os.path.join(workdir, f"{name}_fast.pkl")
+        save_arrays(export_pipeline(pipeline), fast_path)
+        fast = FastForestPredictor.load(fast_path)
+        result["fast"] = {
+            "artifact_bytes": os.path.getsize(fast_path),
+            "load_ms": time_load(fast_path, FastForestPredictor.load),
+            "latency": bench_predict(
+                f"{name} fast",
+                lambda batch: fast.predict(batch.itertuples(index=False, name=None)),
+                X_test, args.batch_sizes, args.repeats,
+            ),
+        }
+    return result
+
+
+def environment():
+    info = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+    try:
+        import xgboost
+        info["xgboost"] = xgboost.__version__
+    except ImportError:
+        info["xgboost"] = None
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variants", nargs="+", default=DEFAULT_VARIANTS,
+                        choices=list(FOREST_VARIANTS) + list(XGB_VARIANTS))
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 10, 100, 10000])
+    parser.add_argument("--repeats", type=int, default=200,
+                        help="calls for batch size 1; larger batches use repeats/sqrt(size)")
+    parser.add_argument("--fast", action="store_true", help="also time the NumPy fast path of forest variants")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    df = load_training_data(DATASET_PATH)
+    X_train, X_test, y_train, y_test = split_features(df)
+    report = {
+        "environment": environment(),
+        "dataset": {"path": os.path.basename(DATASET_PATH), "train_rows": len(X_train), "test_rows": len(X_test)},
+        "batch_sizes": args.batch_sizes,
+        "variants": [],
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.variants:
+            if name in XGB_VARIANTS and report["environment"]["xgboost"] is None:
+                print(f"\n{name}: skipped (xgboost not installed)")
+                continue
+            if name == "current" and not os.path.exists(MODEL_PATH):
+                print(f"\n{name}: skipped ({MODEL_PATH} not found)")
+                continue
+            report["variants"].append(bench_variant(name, X_train, X_test, y_train, y_test, args, workdir))
+
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, datetime.utcnow().strftime("%Y%m%dT%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+    print("\nResults written to:", output)
+
+
+if __name__ == "__main__":
+    main()
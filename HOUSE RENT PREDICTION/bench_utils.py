@@ -0,0 +1,37 @@
+import time
+
+import numpy as np
+
+
+def time_calls(fn, repeats=200, warmup=5):
+    """Call ``fn`` repeatedly and return per-call latencies in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return samples
+
+
+def summarize(samples_ms, rows_per_call=1):
+    """p50/p95/p99 latency and throughput for a list of per-call timings."""
+    samples = np.asarray(samples_ms, dtype=float)
+    mean_ms = float(samples.mean()) if len(samples) else 0.0
+    return {
+        "calls": int(len(samples)),
+        "rows_per_call": int(rows_per_call),
+        "p50_ms": float(np.percentile(samples, 50)) if len(samples) else 0.0,
+        "p95_ms": float(np.percentile(samples, 95)) if len(samples) else 0.0,
+        "p99_ms": float(np.percentile(samples, 99)) if len(samples) else 0.0,
+        "mean_ms": mean_ms,
+        "rows_per_sec": (rows_per_call * 1000.0 / mean_ms) if mean_ms else 0.0,
+    }
+
+
+def format_row(label, stats):
+    return (
+        f"{label:<28} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  "
+        f"p99 {stats['p99_ms']:9.3f} ms  {stats['rows_per_sec']:12,.0f} rows/s"
+    )
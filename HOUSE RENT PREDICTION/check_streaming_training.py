@@ -0,0 +1,100 @@
+"""Check that streaming training stays within a memory limit on a huge file.
+
+Writes a synthetic CSV (rows resampled from House_Rent_10k_major_cities.csv
+with jittered Size and Rent) that is several times larger than
+``--memory-limit-mb``, trains on it with streaming_training.py in a child
+process and fails if the child's peak RSS exceeds the limit.
+
+    python check_streaming_training.py [--rows 30000000] [--memory-limit-mb 640]
+                                       [--shard-rows 500000] [--rounds 50] [--keep]
+
+The default file is about 1.8 GB; peak RSS is roughly 230 MB of imports
+plus 250 MB per million ``--shard-rows``, whatever the file size.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from train_model import DATASET_PATH, required_cols
+
+WRITE_CHUNK_ROWS = 500_000
+
+
+def write_synthetic_csv(path, n_rows, seed=0):
+    source = pd.read_csv(DATASET_PATH, usecols=required_cols)
+    rng = np.random.default_rng(seed)
+    written = 0
+    with open(path, "w", newline="") as fh:
+        while written < n_rows:
+            n = min(WRITE_CHUNK_ROWS, n_rows - written)
+            chunk = source.sample(n, replace=True, random_state=int(rng.integers(2**31))).reset_index(drop=True)
+            chunk["Size"] = (chunk["Size"] * rng.uniform(0.9, 1.1, n)).round()
+            chunk["Rent"] = (chunk["Rent"] * rng.uniform(0.9, 1.1, n)).round()
+            chunk.to_csv(fh, index=False, header=written == 0)
+            written += n
+    return os.path.getsize(path)
+
+
+def train_child(path, chunk_rows, shard_rows, rounds):
+    import streaming_training
+
+    _, report = streaming_training.train_streaming(
+        path, chunk_rows=chunk_rows, shard_rows=shard_rows, num_boost_round=rounds
+    )
+    print("Report:", report)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=30_000_000)
+    parser.add_argument("--memory-limit-mb", type=float, default=640)
+    parser.add_argument("--chunk-rows", type=int, default=200_000)
+    parser.add_argument("--shard-rows", type=int, default=500_000)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--dir", default=None, help="where to write the synthetic file")
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic file")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        train_child(args.child, args.chunk_rows, args.shard_rows, args.rounds)
+        return
+
+    fd, path = tempfile.mkstemp(suffix=".csv", prefix="synthetic-rent-", dir=args.dir)
+    os.close(fd)
+    try:
+        start = time.perf_counter()
+        size_mb = write_synthetic_csv(path, args.rows) / 2**20
+        print(f"Wrote {args.rows:,} rows ({size_mb:,.0f} MB) in {time.perf_counter() - start:.0f}s: {path}")
+        if size_mb < 2 * args.memory_limit_mb:
+            print(f"Warning: file is not much larger than the {args.memory_limit_mb:.0f} MB limit; "
+                  "increase --rows for a meaningful check")
+
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", path,
+             "--chunk-rows", str(args.chunk_rows), "--shard-rows", str(args.shard_rows),
+             "--rounds", str(args.rounds)],
+            check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        # ru_maxrss is in KiB on Linux
+        peak_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        print(f"Trained in {time.perf_counter() - start:.0f}s, peak RSS {peak_mb:,.0f} MB "
+              f"for a {size_mb:,.0f} MB file (limit {args.memory_limit_mb:,.0f} MB)")
+        if peak_mb > args.memory_limit_mb:
+            sys.exit(f"FAIL: peak RSS {peak_mb:,.0f} MB exceeds {args.memory_limit_mb:,.0f} MB")
+        print("OK")
+    finally:
+        if not args.keep:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
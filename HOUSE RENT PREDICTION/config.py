@@ -16,4 +16,65 @@ class Config:
     MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS') or True
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
-    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or 'noreply@houserentprediction.com'
\ No newline at end of file
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or 'noreply@houserentprediction.com'
+
+    # Prediction cache (size 0 disables it, TTL/bucket 0 means none)
+    PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE') or 4096)
+    PREDICTION_CACHE_TTL = int(os.environ.get('PREDICTION_CACHE_TTL') or 3600)
+    PREDICTION_CACHE_SIZE_BUCKET = float(os.environ.get('PREDICTION_CACHE_SIZE_BUCKET') or 0)
+
+    # Serve small predictions from the flattened NumPy forest when its artifact
+    # exists; larger batches are faster through sklearn's compiled trees
+    USE_FAST_PREDICTOR = str(os.environ.get('USE_FAST_PREDICTOR', 'true')).lower() in ('1', 'true', 'yes')
+    FAST_PREDICTOR_MAX_ROWS = int(os.environ.get('FAST_PREDICTOR_MAX_ROWS') or 64)
+
+    # Seconds between checks of model_store for newly trained versions (0 disables)
+    MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL') or 0)
+
+    # Memory-map model arrays so gunicorn workers share them through the page
+    # cache; the sklearn pipeline is then only loaded when a large batch needs it
+    MODEL_MMAP = str(os.environ.get('MODEL_MMAP', 'false')).lower() in ('1', 'true', 'yes')
+
+    # Micro-batching of concurrent /predict_rent calls: rows arriving within
+    # the window (or until MAX_ROWS are queued) share one predict call
+    PREDICTION_BATCH_WINDOW_MS = float(os.environ.get('PREDICTION_BATCH_WINDOW_MS') or 0)
+    PREDICTION_BATCH_MAX_ROWS = int(os.environ.get('PREDICTION_BATCH_MAX_ROWS') or 64)
+    PREDICTION_BATCH_TIMEOUT = float(os.environ.get('PREDICTION_BATCH_TIMEOUT') or 10)
+
+    # Answer predictions from the precomputed grid table when the model has one
+    # (train_model.py --lookup-table); rows it cannot answer use the model.
+    # Opt-in: table answers are interpolated, so they differ from the model;
+    # the build only keeps a table whose held-out p99 error is within
+    # --lookup-max-error, and single answers can exceed it
+    USE_LOOKUP_TABLE = str(os.environ.get('USE_LOOKUP_TABLE', 'false')).lower() in ('1', 'true', 'yes')
+
+    # Incremental updates from new Property rows (/admin/model/incremental or
+    # incremental_training.py): "warm_start" adds INCREMENTAL_TREES trees fitted
+    # on the new rows, "window" refits on the newest INCREMENTAL_WINDOW_ROWS rows.
+    # Saved predictions are the model's own output, so they are opt-in.
+    INCREMENTAL_MODE = os.environ.get('INCREMENTAL_MODE') or 'warm_start'
+    INCREMENTAL_TREES = int(os.environ.get('INCREMENTAL_TREES') or 10)
+    INCREMENTAL_MAX_TREES = int(os.environ.get('INCREMENTAL_MAX_TREES') or 300)
+    INCREMENTAL_WINDOW_ROWS = int(os.environ.get('INCREMENTAL_WINDOW_ROWS') or 20000)
+    INCREMENTAL_MIN_ROWS = int(os.environ.get('INCREMENTAL_MIN_ROWS') or 20)
+    INCREMENTAL_INCLUDE_PREDICTIONS = str(os.environ.get('INCREMENTAL_INCLUDE_PREDICTIONS', 'false')).lower() in ('1', 'true', 'yes')
+
+    # Route predictions to per-city models when the loaded version has them
+    # (train_model.py --sharded); other cities use the global model
+    USE_CITY_SHARDS = str(os.environ.get('USE_CITY_SHARDS', 'true')).lower() in ('1', 'true', 'yes')
+
+    # Keep a typed binary copy of the UI dataset in DATA_CACHE_DIR so workers
+    # skip CSV parsing on start (see /admin/dataset for the footprint)
+    UI_DATASET_CACHE = str(os.environ.get('UI_DATASET_CACHE', 'true')).lower() in ('1', 'true', 'yes')
+
+    # Rows sampled once per dataset load for the homepage's featured cards
+    HOME_FEATURED_POOL = int(os.environ.get('HOME_FEATURED_POOL') or 120)
+
+    # Serialized /listing and /api/listings responses kept for ETag revalidation
+    LISTING_CACHE_SIZE = int(os.environ.get('LISTING_CACHE_SIZE') or 256)
+
+    # Random rows per city turned into featured cards for /property_preview
+    PREVIEW_POOL_SIZE = int(os.environ.get('PREVIEW_POOL_SIZE') or 24)
+
+    # Browser cache lifetime of the content-hashed /api/prediction-options URLs
+    PREDICTION_OPTIONS_MAX_AGE = int(os.environ.get('PREDICTION_OPTIONS_MAX_AGE') or 31536000)
\ No newline at end of file
@@ -0,0 +1,125 @@
+"""Prepared-data cache for CSV sources.
+
+A cleaned, typed frame is stored next to a fingerprint of what produced it:
+the SHA-256 of the source CSV's bytes plus the cleaning config. Reruns with
+the same source and config read the binary copy instead of parsing the CSV;
+any change to either produces a new fingerprint and a rebuild.
+
+Parquet (pyarrow) is used when installed, otherwise a pickle. Hashing a
+large CSV is itself a full read, so the digest is remembered per source
+together with its size and mtime and only recomputed when those change.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_CACHE_DIR = os.getenv("DATA_CACHE_DIR", os.path.join(BASE_DIR, "data_cache"))
+
+_HASH_CHUNK = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def file_digest(path: str, cache_dir: str = DATA_CACHE_DIR) -> str:
+    """SHA-256 of ``path``, reusing the last digest while size and mtime match."""
+    stat = os.stat(path)
+    stamp_path = os.path.join(cache_dir, os.path.basename(path) + ".digest.json")
+    stamp = {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    try:
+        with open(stamp_path) as fh:
+            saved = json.load(fh)
+        if {k: saved.get(k) for k in stamp} == stamp:
+            return saved["sha256"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    stamp["sha256"] = digest.hexdigest()
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(stamp_path, "w") as fh:
+        json.dump(stamp, fh)
+    return stamp["sha256"]
+
+
+def fingerprint(path: str, config: dict, cache_dir: str = DATA_CACHE_DIR) -> str:
+    payload = json.dumps({"source": file_digest(path, cache_dir), "config": config},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:20]
+
+
+def _cache_path(path: str, key: str, cache_dir: str) -> str:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    ext = ".parquet" if _has_pyarrow() else ".pkl"
+    return os.path.join(cache_dir, f"{stem}-{key}{ext}")
+
+
+def _read(cache_path: str) -> pd.DataFrame:
+    if cache_path.endswith(".parquet"):
+        return pd.read_parquet(cache_path)
+    return pd.read_pickle(cache_path)
+
+
+def _write(df: pd.DataFrame, cache_path: str) -> None:
+    # Per-process name: several app workers may rebuild the same entry at once
+    tmp = f"{cache_path}.{os.getpid()}.tmp"
+    if cache_path.endswith(".parquet"):
+        df.to_parquet(tmp, index=False)
+    else:
+        df.reset_index(drop=True).to_pickle(tmp)
+    os.replace(tmp, cache_path)
+
+
+def _remove_stale(path: str, keep: str, cache_dir: str) -> None:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    pattern = re.compile(re.escape(stem) + r"-[0-9a-f]{20}\.(parquet|pkl)$")
+    for name in os.listdir(cache_dir):
+        full = os.path.join(cache_dir, name)
+        if pattern.match(name) and full != keep:
+            try:
+                os.remove(full)
+            except OSError:
+                pass
+
+
+def load_prepared(path: str, prepare, config: dict, cache_dir: str = DATA_CACHE_DIR,
+                  use_cache: bool = True) -> pd.DataFrame:
+    """Return ``prepare(path)``, from the cache when the fingerprint matches.
+
+    ``config`` must describe everything ``prepare`` does to the raw rows
+    (columns, coercions, a version number for the code itself) so that
+    changing the cleaning invalidates old copies.
+    """
+    if not use_cache:
+        return prepare(path)
+    key = fingerprint(path, config, cache_dir)
+    cache_path = _cache_path(path, key, cache_dir)
+    if os.path.exists(cache_path):
+        try:
+            df = _read(cache_path)
+            logger.info("Loaded prepared data from cache: %s", cache_path)
+            return df
+        except Exception as e:
+            logger.warning("Prepared data cache unreadable (%s); rebuilding", e)
+
+    df = prepare(path).reset_index(drop=True)
+    os.makedirs(cache_dir, exist_ok=True)
+    _write(df, cache_path)
+    _remove_stale(path, cache_path, cache_dir)
+    logger.info("Prepared data cached at: %s", cache_path)
+    return df
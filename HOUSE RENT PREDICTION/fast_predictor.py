@@ -0,0 +1,197 @@
+import joblib
+import numpy as np
+
+# Bumped whenever the exported array layout changes
+FORMAT_VERSION = 1
+
+
+def export_pipeline(pipeline) -> dict:
+    """Flatten a fitted train_model.py pipeline into plain NumPy arrays.
+
+    Supports the layout train_model.py builds: a ColumnTransformer with a
+    ``StandardScaler`` on the numeric columns and a ``OneHotEncoder``
+    (``handle_unknown="ignore"``) on the categorical ones, followed by a
+    ``RandomForestRegressor`` (or any single-output forest of decision trees).
+    All trees are concatenated into one set of node arrays; child indices are
+    rewritten to global positions and ``roots`` holds each tree's first node.
+    """
+    preprocessor = pipeline.named_steps["preprocessor"]
+    forest = pipeline.named_steps["model"]
+
+    numeric_features, categorical_features = [], []
+    scaler = encoder = None
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == "drop" or name == "remainder":
+            continue
+        steps = transformer.named_steps if hasattr(transformer, "named_steps") else {name: transformer}
+        if "scaler" in steps:
+            scaler, numeric_features = steps["scaler"], list(columns)
+        elif "onehot" in steps:
+            encoder, categorical_features = steps["onehot"], list(columns)
+        else:
+            raise ValueError(f"Unsupported transformer in pipeline: {name}")
+    if scaler is None or encoder is None:
+        raise ValueError("Pipeline must have a scaler and a one-hot encoder step")
+    if encoder.handle_unknown != "ignore" or encoder.drop is not None:
+        raise ValueError("Only OneHotEncoder(handle_unknown='ignore') without drop is supported")
+
+    categories = [np.asarray(c).astype(str) for c in encoder.categories_]
+    category_offsets = np.cumsum([0] + [len(c) for c in categories])
+
+    children_left, children_right, feature, threshold, value, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        if tree.n_outputs != 1:
+            raise ValueError("Only single-output regression trees are supported")
+        left = tree.children_left.astype(np.int64)
+        right = tree.children_right.astype(np.int64)
+        is_leaf = left == -1
+        children_left.append(np.where(is_leaf, -1, left + offset))
+        children_right.append(np.where(is_leaf, -1, right + offset))
+        # Leaves keep feature 0 so the vectorized walk can index X safely
+        feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        threshold.append(tree.threshold.astype(np.float64))
+        value.append(tree.value[:, 0, 0].astype(np.float64))
+        roots.append(offset)
+        offset += tree.node_count
+
+    return {
+        "format_version": np.int64(FORMAT_VERSION),
+        "numeric_features": np.asarray(numeric_features, dtype=str),
+        "numeric_mean": np.asarray(scaler.mean_, dtype=np.float64),
+        "numeric_scale": np.asarray(scaler.scale_, dtype=np.float64),
+        "categorical_features": np.asarray(categorical_features, dtype=str),
+        "category_values": np.concatenate(categories) if categories else np.asarray([], dtype=str),
+        "category_offsets": category_offsets.astype(np.int64),
+        "children_left": np.concatenate(children_left),
+        "children_right": np.concatenate(children_right),
+        "feature": np.concatenate(feature),
+        "threshold": np.concatenate(threshold),
+        "value": np.concatenate(value),
+        "roots": np.asarray(roots, dtype=np.int64),
+    }
+
+
+def save_arrays(arrays: dict, path: str) -> None:
+    # Uncompressed so the node arrays are stored as raw contiguous buffers
+    joblib.dump(arrays, path, compress=0)
+
+
+class FastForestPredictor:
+    """Evaluates an exported forest on plain Python/NumPy inputs.
+
+    ``predict`` takes a sequence of rows in ``feature_order`` (numeric
+    features first, then categorical, the same order as the training
+    frame) and returns a float64 array matching ``pipeline.predict``.
+
+    It removes the per-call pandas/ColumnTransformer/joblib overhead, which
+    dominates small requests; for large batches the Cython tree code in
+    sklearn is faster, so callers should route those to the pipeline.
+    """
+
+    def __init__(self, arrays: dict):
+        if int(arrays["format_version"]) != FORMAT_VERSION:
+            raise ValueError("Unsupported fast predictor format")
+        self.numeric_features = [str(f) for f in arrays["numeric_features"]]
+        self.categorical_features = [str(f) for f in arrays["categorical_features"]]
+        self.feature_order = self.numeric_features + self.categorical_features
+        self.mean = arrays["numeric_mean"]
+        self.scale = arrays["numeric_scale"]
+        self.children_left = arrays["children_left"]
+        self.children_right = arrays["children_right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+
+        n_numeric = len(self.numeric_features)
+        offsets = arrays["category_offsets"]
+        values = arrays["category_values"]
+        self.n_features = n_numeric + int(offsets[-1])
+        # value -> output column, one dict per categorical feature
+        self.category_columns = [
+            {str(v): n_numeric + int(offsets[i]) + j for j, v in enumerate(values[offsets[i]:offsets[i + 1]])}
+            for i in range(len(self.categorical_features))
+        ]
+
+    @classmethod
+    def load(cls, path: str, mmap_mode=None):
+        return cls(joblib.load(path, mmap_mode=mmap_mode))
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        return cls(export_pipeline(pipeline))
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def transform(self, rows) -> np.ndarray:
+        """Encode rows exactly like the ColumnTransformer (as float32, like the trees see it)."""
+        rows = list(rows)
+        n_numeric = len(self.numeric_features)
+        X = np.zeros((len(rows), self.n_features), dtype=np.float32)
+        if not rows:
+            return X
+        numeric = np.array([row[:n_numeric] for row in rows], dtype=np.float64)
+        X[:, :n_numeric] = (numeric - self.mean) / self.scale
+        for i, columns in enumerate(self.category_columns):
+            position = n_numeric + i
+            for r, row in enumerate(rows):
+                column = columns.get(row[position])
+                if column is not None:  # unknown categories encode as all zeros
+                    X[r, column] = 1.0
+        return X
+
+    def predict_transformed(self, X: np.ndarray) -> np.ndarray:
+        """Walk every (row, tree) pair down to its leaf in lock-step.
+
+        Pairs that reach a leaf drop out of the active set, so each step
+        only touches the walks that are still descending.
+        """
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        flat_X = np.ascontiguousarray(X).ravel()
+        nodes = np.tile(self.roots, n_rows)
+        row_base = np.repeat(np.arange(n_rows, dtype=np.int64) * n_features, n_trees)
+        active = np.arange(nodes.size)
+        while active.size:
+            current = nodes[active]
+            left = self.children_left[current]
+            internal = left != -1
+            active, current, left = active[internal], current[internal], left[internal]
+            go_left = flat_X[row_base[active] + self.feature[current]] <= self.threshold[current]
+            nodes[active] = np.where(go_left, left, self.children_right[current])
+        return self.value[nodes].reshape(n_rows, n_trees).mean(axis=1)
+
+    def predict(self, rows) -> np.ndarray:
+        return self.predict_transformed(self.transform(rows))
+
+
+def probe_rows(predictor, n_rows=32):
+    """Deterministic rows touching every known category, for parity checks."""
+    categories = [list(columns) for columns in predictor.category_columns]
+    n_rows = max([n_rows] + [len(c) for c in categories])
+    rows = []
+    for i in range(n_rows):
+        numeric = [float(m + s * ((i % 7) - 3) / 2) for m, s in zip(predictor.mean, predictor.scale)]
+        rows.append(tuple(numeric) + tuple(c[i % len(c)] if c else "" for c in categories))
+    return rows
+
+
+def check_parity(pipeline, predictor, rows, rtol=1e-9, atol=1e-6):
+    """Compare the fast predictor with ``pipeline.predict`` on ``rows``.
+
+    Returns the maximum absolute difference and raises ``AssertionError``
+    if any prediction falls outside the tolerance.
+    """
+    import pandas as pd
+
+    rows = list(rows)
+    expected = pipeline.predict(pd.DataFrame(rows, columns=predictor.feature_order))
+    actual = predictor.predict(rows)
+    max_diff = float(np.max(np.abs(expected - actual))) if rows else 0.0
+    if not np.allclose(expected, actual, rtol=rtol, atol=atol):
+        raise AssertionError(f"Fast predictor differs from pipeline (max abs diff {max_diff:.6g})")
+    return max_diff
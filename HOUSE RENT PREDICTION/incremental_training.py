@@ -0,0 +1,200 @@
+"""Incremental model updates from listings (and optionally predictions) in the database.
+
+Two modes, both publishing a new model_store version that app.py hot-loads:
+
+``warm_start``
+    Copies the serving forest and grows ``trees_per_update`` extra trees
+    fitted only on rows added since the base model's watermark, with the
+    base model's fitted preprocessor. Cost is proportional to the new rows.
+    Once the forest exceeds ``max_trees`` the oldest trees are dropped.
+
+``window``
+    Refits the whole pipeline on the newest ``window_rows`` rows: the CSV's
+    training split ordered by "Posted On" followed by the database rows in
+    time order. The CSV's test split is never trained on.
+
+PredictionResult rows only carry the model's own output, so learning from
+them reinforces the model rather than correcting it; they are used only
+when ``include_predictions`` is set.
+
+Only random forests get a fast-path export; other models (gradient boosting,
+streaming xgboost) are published without one. The base version's city
+shards are carried over unchanged, trained on the data they saw then.
+
+Must run inside an app context. From the command line::
+
+    python incremental_training.py [--mode warm_start|window] [--include-predictions]
+"""
+import copy
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+
+import model_store
+from fast_predictor import export_pipeline
+from models import PredictionResult, Property
+from train_model import (
+    build_pipeline, evaluate, feature_columns, is_forest, load_training_data, split_features, target_column,
+)
+
+MODES = ("warm_start", "window")
+
+
+def _parse_time(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def base_watermark(meta: dict):
+    """Rows newer than this are new to the model with ``meta``."""
+    return _parse_time(meta.get("watermark")) or _parse_time(meta.get("created_at"))
+
+
+def fetch_new_rows(since=None, include_predictions=False) -> pd.DataFrame:
+    """Database rows changed after ``since`` as a training frame plus ``_at`` timestamps."""
+    query = Property.query
+    if since is not None:
+        query = query.filter(Property.updated_at > since)
+    records = [
+        {
+            "Size": p.size, "BHK": p.bedrooms, "Bathroom": p.bathrooms, "City": p.city,
+            "Furnishing Status": p.furnishing_status, "Tenant Preferred": p.tenant_preferred,
+            "Area Type": p.area_type, target_column: p.price, "_at": p.updated_at or p.created_at,
+        }
+        for p in query.all()
+    ]
+    if include_predictions:
+        query = PredictionResult.query
+        if since is not None:
+            query = query.filter(PredictionResult.created_at > since)
+        records += [
+            {
+                "Size": r.size, "BHK": r.bhk, "Bathroom": r.bathroom, "City": r.city,
+                "Furnishing Status": r.furnishing_status, "Tenant Preferred": r.tenant_preferred,
+                "Area Type": r.area_type, target_column: r.predicted_rent, "_at": r.created_at,
+            }
+            for r in query.all()
+        ]
+
+    df = pd.DataFrame(records, columns=feature_columns + [target_column, "_at"])
+    df = df.dropna(subset=feature_columns + [target_column])
+    df = df[(df["Size"] > 0) & (df[target_column] > 0)]
+    return df.sort_values("_at", kind="stable").reset_index(drop=True)
+
+
+def tree_count(model):
+    """Trees (or boosting rounds) in a fitted model."""
+    if hasattr(model, "get_booster"):
+        return int(model.get_booster().num_boosted_rounds())
+    if hasattr(model, "estimators_"):
+        return len(model.estimators_)
+    return model.get_params().get("n_estimators")
+
+
+def warm_start_update(base_pipeline, new_rows, trees_per_update=10, max_trees=300):
+    """Return a copy of ``base_pipeline`` with trees added for ``new_rows``."""
+    if not isinstance(base_pipeline.named_steps["model"], RandomForestRegressor):
+        raise ValueError("warm_start updates need a random forest; use the window mode")
+    pipeline = copy.deepcopy(base_pipeline)
+    preprocessor = pipeline.named_steps["preprocessor"]
+    forest = pipeline.named_steps["model"]
+    forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + trees_per_update)
+    # Reuse the fitted encoder/scaler so old and new trees see the same columns
+    forest.fit(preprocessor.transform(new_rows[feature_columns]), new_rows[target_column].to_numpy())
+    forest.set_params(warm_start=False)
+    if len(forest.estimators_) > max_trees:
+        forest.estimators_ = forest.estimators_[-max_trees:]
+        forest.set_params(n_estimators=max_trees)
+    return pipeline
+
+
+def window_update(base_pipeline, new_rows, window_rows=20000):
+    """Refit ``base_pipeline``'s configuration on the newest ``window_rows`` rows."""
+    history = load_training_data()
+    # Leave out train_model.py's test split; run_incremental_update scores on it
+    X_train, _, _, _ = split_features(history)
+    history = history.loc[X_train.index]
+    if "Posted On" in history.columns:
+        order = pd.to_datetime(history["Posted On"], errors="coerce")
+        history = history.iloc[np.argsort(order.to_numpy(), kind="stable")]
+    frame = pd.concat(
+        [history[feature_columns + [target_column]], new_rows[feature_columns + [target_column]]],
+        ignore_index=True,
+    ).tail(window_rows)
+    pipeline = clone(base_pipeline) if base_pipeline is not None else build_pipeline()
+    pipeline.fit(frame[feature_columns], frame[target_column])
+    return pipeline
+
+
+def run_incremental_update(base_pipeline, base_meta, mode="warm_start", include_predictions=False,
+                           trees_per_update=10, max_trees=300, window_rows=20000, min_rows=20):
+    """Train on rows newer than the base model and publish the result.
+
+    Returns the new version name, or None when fewer than ``min_rows`` new
+    rows exist.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown incremental mode {mode!r}")
+    since = base_watermark(base_meta)
+    new_rows = fetch_new_rows(since, include_predictions)
+    if len(new_rows) < min_rows:
+        return None
+
+    if mode == "warm_start":
+        pipeline = warm_start_update(base_pipeline, new_rows, trees_per_update, max_trees)
+    else:
+        pipeline = window_update(base_pipeline, new_rows, window_rows)
+    # The CSV test split train_model.py reports on; neither mode trains on it,
+    # so versions stay comparable
+    _, X_test, _, y_test = split_features(load_training_data())
+    rmse, r2 = evaluate(pipeline, X_test, y_test)
+
+    watermark = max(new_rows["_at"].max(), since) if since is not None else new_rows["_at"].max()
+    base_version = base_meta.get("version")
+    shards_from = base_version if base_version and model_store.read_shard_manifest(base_version) else None
+    return model_store.publish_version(
+        pipeline,
+        export_pipeline(pipeline) if is_forest(pipeline) else None,
+        {
+            "rmse": rmse,
+            "r2": r2,
+            "base_version": base_version,
+            "watermark": pd.Timestamp(watermark).isoformat(),
+            "incremental": {
+                "mode": mode,
+                "new_rows": len(new_rows),
+                "include_predictions": include_predictions,
+                "n_estimators": tree_count(pipeline.named_steps["model"]),
+                # Shards are copied as they were, not retrained on the new rows
+                "city_shards_from": shards_from,
+            },
+            "params": pipeline.named_steps["model"].get_params(),
+        },
+        shards_from=shards_from,
+    )
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Incremental model update from the database.")
+    parser.add_argument("--mode", choices=MODES, default=None)
+    parser.add_argument("--include-predictions", action="store_true")
+    args = parser.parse_args()
+
+    from app import app, run_incremental_training
+
+    with app.app_context():
+        result = run_incremental_training(mode=args.mode, include_predictions=args.include_predictions or None)
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
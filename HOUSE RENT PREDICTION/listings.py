@@ -0,0 +1,216 @@
+"""Server-side filtering, sorting and cursor pagination for /api/listings.
+
+A ``ListingCatalog`` is built once per inventory (the Property table, or the
+UI dataset when it is empty) from the same card dicts listing.html renders.
+Filter and sort columns are kept as NumPy arrays, so a query is a handful
+of vectorized comparisons and only the requested page is serialized.
+
+Pages are addressed by an opaque keyset cursor: the sort key and catalog
+position of the last row served. It stays valid when the catalog is
+rebuilt, the next page simply starts after that row.
+"""
+import base64
+import json
+import re
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+SORTS = ("recent", "price_asc", "price_desc", "newest")
+# listing.html's <select id="sortSelect"> values
+SORT_ALIASES = {"1": "recent", "2": "price_asc", "3": "price_desc", "4": "newest"}
+DEFAULT_PAGE_SIZE = 12
+MAX_PAGE_SIZE = 100
+
+
+def slugify(value) -> str:
+    """Same normalisation as listing.html's ``slugify``."""
+    return re.sub(r"^-|-$", "", re.sub(r"[^a-z0-9]+", "-", str(value or "").lower()))
+
+
+class ListingQuery(NamedTuple):
+    q: str = ""
+    city: str = ""
+    category: str = ""
+    furnishing: str = ""
+    tenant: str = ""
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    beds: str = ""
+    baths: str = ""
+    sort: str = "recent"
+
+
+def _count_filter(value: str, errors: dict, name: str):
+    """``"3"`` -> exactly 3, ``"5+"`` -> at least 5, ``""``/``"All"`` -> None."""
+    value = (value or "").strip()
+    if not value or value.lower() == "all":
+        return None
+    at_least = value.endswith("+")
+    try:
+        number = int(value[:-1] if at_least else value)
+    except ValueError:
+        errors[name] = "Expected a number such as 2 or 5+"
+        return None
+    return number, at_least
+
+
+def parse_query(args) -> tuple:
+    """``ListingQuery`` from request args, and a dict of errors."""
+    errors = {}
+    prices = {}
+    for name in ("min_price", "max_price"):
+        raw = (args.get(name) or "").strip()
+        try:
+            prices[name] = float(raw) if raw else None
+        except ValueError:
+            errors[name] = "Expected a number"
+            prices[name] = None
+    sort = (args.get("sort") or "recent").strip()
+    sort = SORT_ALIASES.get(sort, sort)
+    if sort not in SORTS:
+        errors["sort"] = f"Expected one of {', '.join(SORTS)}"
+        sort = "recent"
+    query = ListingQuery(
+        q=(args.get("q") or "").strip().lower(),
+        city=(args.get("city") or "").strip(),
+        category=(args.get("category") or "").strip(),
+        furnishing=(args.get("furnishing") or "").strip(),
+        tenant=(args.get("tenant") or "").strip(),
+        beds=(args.get("beds") or "").strip(),
+        baths=(args.get("baths") or "").strip(),
+        sort=sort,
+        **prices,
+    )
+    _count_filter(query.beds, errors, "beds")
+    _count_filter(query.baths, errors, "baths")
+    return query, errors
+
+
+def encode_cursor(sort: str, key: float, position: int) -> str:
+    payload = json.dumps({"s": sort, "k": key, "p": position}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str):
+    """``(key, position)`` of the last row served; ValueError when malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key, position = float(payload["k"]), int(payload["p"])
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if payload.get("s") != sort:
+        raise ValueError("Cursor belongs to a different sort order")
+    return key, position
+
+
+def _timestamp(value) -> float:
+    if not value:
+        return np.nan
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return np.nan
+
+
+class ListingCatalog:
+    """Listing cards plus the columns /api/listings filters and sorts on."""
+
+    def __init__(self, items):
+        self.items = list(items)
+        n = len(self.items)
+
+        def column(key, default=""):
+            return [item.get(key) or default for item in self.items]
+
+        self.location = np.array(column("location"), dtype=object)
+        self.category = np.array([slugify(v) for v in column("category")], dtype=object)
+        self.furnishing = np.array([slugify(v) for v in column("furnishing_status")], dtype=object)
+        self.tenant = np.array([slugify(v) for v in column("tenant_preferred")], dtype=object)
+        self.price = np.array([float(v) for v in column("price", 0)], dtype=np.float64)
+        self.beds = np.array([int(v) for v in column("bedrooms", 0)], dtype=np.int64)
+        self.baths = np.array([int(v) for v in column("bathrooms", 0)], dtype=np.int64)
+        self.created = np.array([_timestamp(v) for v in column("created_at")], dtype=np.float64)
+        self.text = pd.Series(
+            [f"{i.get('title') or ''}\n{i.get('location') or ''}\n{i.get('description') or ''}".lower()
+             for i in self.items],
+            dtype=object,
+        )
+        self.positions = np.arange(n)
+
+    def __len__(self):
+        return len(self.items)
+
+    def facets(self) -> dict:
+        """Distinct values for the filter datalists."""
+        def distinct(key):
+            return sorted({str(item.get(key)) for item in self.items if item.get(key)})
+        return {
+            "cities": distinct("location"),
+            "categories": distinct("category"),
+            "furnishing": distinct("furnishing_status"),
+            "tenants": distinct("tenant_preferred"),
+            "bedrooms": sorted(set(self.beds.tolist())),
+            "bathrooms": sorted(set(self.baths.tolist())),
+        }
+
+    def _mask(self, query: ListingQuery) -> np.ndarray:
+        mask = np.ones(len(self.items), dtype=bool)
+        if query.city and query.city.lower() not in ("all", "all cities"):
+            mask &= self.location == query.city
+        for value, values in ((query.category, self.category), (query.furnishing, self.furnishing),
+                              (query.tenant, self.tenant)):
+            if value and value.lower() != "all":
+                mask &= values == slugify(value)
+        if query.min_price is not None:
+            mask &= self.price >= query.min_price
+        if query.max_price is not None:
+            mask &= self.price <= query.max_price
+        for value, counts in ((query.beds, self.beds), (query.baths, self.baths)):
+            parsed = _count_filter(value, {}, "")
+            if parsed is not None:
+                number, at_least = parsed
+                mask &= (counts >= number) if at_least else (counts == number)
+        if query.q and mask.any():
+            candidates = np.flatnonzero(mask)
+            found = self.text.iloc[candidates].str.contains(query.q, regex=False).to_numpy(dtype=bool)
+            mask[candidates[~found]] = False
+        return mask
+
+    def _sort_key(self, sort: str) -> np.ndarray:
+        """Ascending key for ``sort``; rows without a date go last."""
+        if sort == "price_asc":
+            return self.price
+        if sort == "price_desc":
+            return -self.price
+        return np.where(np.isnan(self.created), np.inf, -self.created)
+
+    def query(self, query: ListingQuery, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+        """One page of matches; raises ValueError for a bad cursor."""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        mask = self._mask(query)
+        total = int(mask.sum())
+        key = self._sort_key(query.sort)
+        if cursor:
+            last_key, last_position = decode_cursor(cursor, query.sort)
+            mask &= (key > last_key) | ((key == last_key) & (self.positions > last_position))
+        matches = np.flatnonzero(mask)
+        # Sort key, then catalog order, like the page's stable Array.sort
+        order = matches[np.lexsort((matches, key[matches]))]
+        page = order[:limit]
+        next_cursor = None
+        if len(order) > limit:
+            last = int(page[-1])
+            next_cursor = encode_cursor(query.sort, float(key[last]), last)
+        return {
+            "items": [self.items[i] for i in page],
+            "total": total,
+            "limit": limit,
+            "next_cursor": next_cursor,
+        }
+
+
+EMPTY_CATALOG = ListingCatalog([])
@@ -0,0 +1,225 @@
+"""Precomputed predictions over the model's discrete feature grid.
+
+Apart from Size every feature takes a handful of values, so the model can be
+evaluated offline for every (BHK, Bathroom, City, Furnishing, Tenant, Area
+Type) combination at a fixed set of Size knots. Serving then answers a row
+with one array index and a linear interpolation between the two
+surrounding knots.
+
+Forests are step functions of Size, so interpolation is not exact. The
+build step also evaluates the model between the knots and marks each
+(combination, interval) cell as trusted only when the interpolation stayed
+within ``max_rel_error`` at ``check_points`` sizes inside it. The forest can
+still step between those points, so this is a sampled bound, not a hard
+one; ``check_error`` measures what is actually served on held-out rows.
+Rows that land in an untrusted cell, outside the Size range or on values
+outside the grid are left for the real model.
+"""
+import joblib
+import numpy as np
+
+# Bumped whenever the array layout changes
+FORMAT_VERSION = 1
+
+# Grid axes in PREDICTION_FEATURES order, after Size
+AXIS_FEATURES = ["BHK", "Bathroom", "City", "Furnishing Status", "Tenant Preferred", "Area Type"]
+NUMERIC_AXES = ("BHK", "Bathroom")
+
+
+def grid_axes(pipeline, df) -> dict:
+    """Axis values: the encoder's categories and the integer counts seen in ``df``."""
+    encoder = None
+    for name, transformer, columns in pipeline.named_steps["preprocessor"].transformers_:
+        steps = getattr(transformer, "named_steps", {})
+        if "onehot" in steps:
+            encoder, categorical = steps["onehot"], list(columns)
+    if encoder is None:
+        raise ValueError("Pipeline has no one-hot encoder step")
+    categories = dict(zip(categorical, encoder.categories_))
+    axes = {}
+    for feature in AXIS_FEATURES:
+        if feature in NUMERIC_AXES:
+            axes[feature] = np.unique(df[feature].dropna().astype(np.int64))
+        else:
+            axes[feature] = np.asarray(categories[feature]).astype(str)
+    return axes
+
+
+def _axis_frame(axes, combos, sizes):
+    """Feature frame for every size at every combination index in ``combos``."""
+    import pandas as pd
+
+    shape = [len(axes[f]) for f in AXIS_FEATURES]
+    indices = np.unravel_index(np.repeat(combos, len(sizes)), shape)
+    frame = {"Size": np.tile(sizes, len(combos))}
+    for feature, index in zip(AXIS_FEATURES, indices):
+        frame[feature] = axes[feature][index]
+    return pd.DataFrame(frame, columns=["Size"] + AXIS_FEATURES)
+
+
+def build_lookup_table(pipeline, axes, size_min, size_max, n_knots=128,
+                       max_rel_error=0.02, check_points=1, chunk_rows=200_000) -> dict:
+    """Evaluate ``pipeline`` over the full grid and return the table arrays."""
+    knots = np.linspace(float(size_min), float(size_max), int(n_knots))
+    # Check points strictly inside every knot interval
+    fractions = np.arange(1, check_points + 1) / (check_points + 1)
+    checks = (knots[:-1, None] + np.diff(knots)[:, None] * fractions).ravel()
+    sizes = np.concatenate([knots, checks])
+
+    n_combos = int(np.prod([len(axes[f]) for f in AXIS_FEATURES]))
+    values = np.empty((n_combos, len(knots)), dtype=np.float32)
+    trusted = np.empty((n_combos, len(knots) - 1), dtype=bool)
+    per_chunk = max(chunk_rows // len(sizes), 1)
+    for start in range(0, n_combos, per_chunk):
+        combos = np.arange(start, min(start + per_chunk, n_combos))
+        predicted = pipeline.predict(_axis_frame(axes, combos, sizes)).reshape(len(combos), len(sizes))
+        at_knots = predicted[:, :len(knots)]
+        at_checks = predicted[:, len(knots):].reshape(len(combos), len(knots) - 1, check_points)
+        interpolated = (
+            at_knots[:, :-1, None] * (1 - fractions) + at_knots[:, 1:, None] * fractions
+        )
+        error = np.abs(interpolated - at_checks) / np.maximum(np.abs(at_checks), 1.0)
+        values[combos] = at_knots
+        trusted[combos] = error.max(axis=2) <= max_rel_error
+
+    arrays = {
+        "format_version": np.int64(FORMAT_VERSION),
+        "knots": knots,
+        "values": values,
+        "trusted": trusted,
+        "max_rel_error": np.float64(max_rel_error),
+    }
+    for feature in AXIS_FEATURES:
+        arrays["axis:" + feature] = axes[feature]
+    return arrays
+
+
+def save_arrays(arrays: dict, path: str) -> None:
+    # Uncompressed so the table can be memory-mapped
+    joblib.dump(arrays, path, compress=0)
+
+
+class PredictionLookupTable:
+    """O(1) rent lookup for rows in PREDICTION_FEATURES order."""
+
+    def __init__(self, arrays: dict):
+        if int(arrays["format_version"]) != FORMAT_VERSION:
+            raise ValueError("Unsupported lookup table format")
+        self.knots = arrays["knots"]
+        self.values = arrays["values"]
+        self.trusted = arrays["trusted"]
+        self.max_rel_error = float(arrays["max_rel_error"])
+        self.axes = [arrays["axis:" + f] for f in AXIS_FEATURES]
+        self.shape = tuple(len(a) for a in self.axes)
+        # value -> axis position, one dict per axis
+        self.positions = [
+            {(int(v) if f in NUMERIC_AXES else str(v)): i for i, v in enumerate(axis)}
+            for f, axis in zip(AXIS_FEATURES, self.axes)
+        ]
+
+    @classmethod
+    def load(cls, path: str, mmap_mode=None):
+        return cls(joblib.load(path, mmap_mode=mmap_mode))
+
+    @property
+    def coverage(self) -> float:
+        """Share of grid cells that are answered from the table."""
+        return float(self.trusted.mean()) if self.trusted.size else 0.0
+
+    def combo_index(self, row):
+        """Flat grid cell of ``row``'s discrete features, or -1 when it is off the grid."""
+        index = []
+        for value, positions, feature in zip(row[1:], self.positions, AXIS_FEATURES):
+            if feature in NUMERIC_AXES:
+                try:
+                    if float(value) != int(value):
+                        return -1
+                    value = int(value)
+                except (TypeError, ValueError):
+                    return -1
+            position = positions.get(value)
+            if position is None:
+                return -1
+            index.append(position)
+        return int(np.ravel_multi_index(index, self.shape))
+
+    def lookup(self, rows):
+        """Return ``(values, hit)``; values are NaN where ``hit`` is False."""
+        rows = list(rows)
+        values = np.full(len(rows), np.nan)
+        hit = np.zeros(len(rows), dtype=bool)
+        if not rows:
+            return values, hit
+        combos = np.array([self.combo_index(row) for row in rows], dtype=np.int64)
+        sizes = np.array([row[0] for row in rows], dtype=np.float64)
+        knots = self.knots
+        in_grid = (combos >= 0) & (sizes >= knots[0]) & (sizes <= knots[-1])
+        rows_idx = np.flatnonzero(in_grid)
+        if not rows_idx.size:
+            return values, hit
+        c, s = combos[rows_idx], sizes[rows_idx]
+        j = np.clip(np.searchsorted(knots, s, side="right") - 1, 0, len(knots) - 2)
+        ok = self.trusted[c, j]
+        rows_idx, c, s, j = rows_idx[ok], c[ok], s[ok], j[ok]
+        t = (s - knots[j]) / (knots[j + 1] - knots[j])
+        values[rows_idx] = self.values[c, j] * (1 - t) + self.values[c, j + 1] * t
+        hit[rows_idx] = True
+        return values, hit
+
+
+def knot_rows(table, n_rows=32, seed=0):
+    """Rows sitting exactly on knots, whose table value must equal the model's."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(n_rows):
+        index = [int(rng.integers(len(axis))) for axis in table.axes]
+        size = float(table.knots[int(rng.integers(len(table.knots)))])
+        values = [axis[i].item() if hasattr(axis[i], "item") else axis[i] for axis, i in zip(table.axes, index)]
+        rows.append((size, *[int(v) if f in NUMERIC_AXES else str(v) for f, v in zip(AXIS_FEATURES, values)]))
+    return rows
+
+
+def check_knots(pipeline, table, rows, rtol=1e-5):
+    """Raise ``AssertionError`` unless the table reproduces ``pipeline`` on knot rows.
+
+    Catches a table left over from a different model.
+    """
+    import pandas as pd
+
+    rows = list(rows)
+    expected = pipeline.predict(pd.DataFrame(rows, columns=["Size"] + AXIS_FEATURES))
+    bins = np.searchsorted(table.knots, [row[0] for row in rows])
+    combos = np.array([table.combo_index(row) for row in rows])
+    actual = table.values[combos, bins]
+    if not np.allclose(expected, actual, rtol=rtol):
+        raise AssertionError("Lookup table does not match the pipeline at its knots")
+
+
+def check_error(pipeline, table, rows, max_rel_error=None):
+    """Compare table answers with ``pipeline.predict`` on ``rows``.
+
+    Returns hit rate and relative error statistics over the rows the table
+    answered. With ``max_rel_error`` it raises ``AssertionError`` when the
+    99th percentile error exceeds it.
+    """
+    import pandas as pd
+
+    rows = list(rows)
+    values, hit = table.lookup(rows)
+    report = {"rows": len(rows), "hits": int(hit.sum()),
+              "hit_rate": float(hit.mean()) if rows else 0.0,
+              "max_rel_error": 0.0, "p99_rel_error": 0.0, "mean_rel_error": 0.0}
+    if hit.any():
+        hit_rows = [row for row, h in zip(rows, hit) if h]
+        expected = pipeline.predict(pd.DataFrame(hit_rows, columns=["Size"] + AXIS_FEATURES))
+        error = np.abs(values[hit] - expected) / np.maximum(np.abs(expected), 1.0)
+        report.update(
+            max_rel_error=float(error.max()),
+            p99_rel_error=float(np.percentile(error, 99)),
+            mean_rel_error=float(error.mean()),
+        )
+    if max_rel_error is not None and report["p99_rel_error"] > max_rel_error:
+        raise AssertionError(
+            f"Lookup table p99 relative error {report['p99_rel_error']:.4f} exceeds {max_rel_error}"
+        )
+    return report
@@ -0,0 +1,116 @@
+"""Per-worker RSS and PSS for each way a worker can hold the model.
+
+Starts ``--workers`` fresh processes per mode (like gunicorn workers), lets
+each load the model and make one prediction, then reads
+/proc/<pid>/smaps_rollup while they are all alive. PSS divides shared pages
+between the processes mapping them, so the total PSS is what the workers
+really cost together.
+
+    python measure_worker_memory.py [--workers 4] [--version <model version>]
+
+Modes:
+    baseline     imports only, no model
+    pickle       joblib.load of the pipeline (default serving)
+    pickle-mmap  joblib.load(mmap_mode="r") of the pipeline
+    fast-mmap    memory-mapped fast predictor, as served with MODEL_MMAP=true
+
+Linux only (needs smaps_rollup).
+"""
+import argparse
+import multiprocessing as mp
+import os
+
+import model_store
+from train_model import FAST_MODEL_PATH, MODEL_PATH
+
+MODES = ("baseline", "pickle", "pickle-mmap", "fast-mmap")
+PROBE_ROW = (1000.0, 2, 2, "Mumbai", "Furnished", "Family", "Carpet Area")
+
+
+def model_paths(version=None):
+    version = version or model_store.latest_version()
+    if version:
+        vdir = model_store.version_dir(version)
+        return (
+            os.path.join(vdir, model_store.MODEL_FILENAME),
+            os.path.join(vdir, model_store.FAST_MODEL_FILENAME),
+        )
+    return MODEL_PATH, FAST_MODEL_PATH
+
+
+def read_memory(pid):
+    """Rss and Pss in MB from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as fh:
+        for line in fh:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key.lower()] = int(rest.split()[0]) / 1024.0
+    return values
+
+
+def worker(mode, model_path, fast_path, ready, release):
+    # Same heavy imports as app.py, so the baseline is comparable
+    import joblib
+    import numpy as np  # noqa: F401
+    import pandas as pd
+    import sklearn.ensemble  # noqa: F401
+
+    from fast_predictor import FastForestPredictor
+
+    if mode in ("pickle", "pickle-mmap"):
+        pipeline = joblib.load(model_path, mmap_mode="r" if mode == "pickle-mmap" else None)
+        columns = ["Size", "BHK", "Bathroom", "City", "Furnishing Status", "Tenant Preferred", "Area Type"]
+        pipeline.predict(pd.DataFrame([PROBE_ROW], columns=columns))
+    elif mode == "fast-mmap":
+        fast = FastForestPredictor.load(fast_path, mmap_mode="r")
+        fast.predict([PROBE_ROW])
+    ready.put(os.getpid())
+    release.wait()
+
+
+def measure(mode, workers, model_path, fast_path):
+    ctx = mp.get_context("spawn")
+    ready = ctx.Queue()
+    release = ctx.Event()
+    procs = [
+        ctx.Process(target=worker, args=(mode, model_path, fast_path, ready, release))
+        for _ in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    try:
+        pids = [ready.get(timeout=300) for _ in procs]
+        return [read_memory(pid) for pid in pids]
+    finally:
+        release.set()
+        for proc in procs:
+            proc.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--version", default=None)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    model_path, fast_path = model_paths(args.version)
+    print(f"Model: {model_path} ({os.path.getsize(model_path) / 2**20:.1f} MB)")
+    if os.path.exists(fast_path):
+        print(f"Fast:  {fast_path} ({os.path.getsize(fast_path) / 2**20:.1f} MB)")
+    print(f"{args.workers} workers per mode\n")
+    print(f"{'mode':<12} {'RSS/worker':>12} {'PSS/worker':>12} {'total PSS':>12}")
+
+    for mode in args.modes:
+        if mode == "fast-mmap" and not os.path.exists(fast_path):
+            print(f"{mode:<12} skipped (no fast predictor file)")
+            continue
+        samples = measure(mode, args.workers, model_path, fast_path)
+        rss = sum(s["rss"] for s in samples) / len(samples)
+        pss = sum(s["pss"] for s in samples) / len(samples)
+        print(f"{mode:<12} {rss:10.1f} MB {pss:10.1f} MB {pss * len(samples):10.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
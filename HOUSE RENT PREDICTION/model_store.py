@@ -0,0 +1,163 @@
+"""Versioned model artifacts shared by train_model.py and app.py.
+
+Each trained model is published as its own directory::
+
+    model_store/<version>/house_rent_model.pkl
+    model_store/<version>/house_rent_model_fast.pkl
+    model_store/<version>/house_rent_model_lut.pkl   (optional)
+    model_store/<version>/shards/manifest.json     (optional, per-city models)
+    model_store/<version>/meta.json
+
+Versions sort chronologically by name. A version is written to a hidden
+temporary directory and renamed into place, so a reader never sees a
+half-written one.
+"""
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime
+
+import joblib
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_STORE_DIR = os.getenv("MODEL_STORE_DIR", os.path.join(BASE_DIR, "model_store"))
+
+MODEL_FILENAME = "house_rent_model.pkl"
+FAST_MODEL_FILENAME = "house_rent_model_fast.pkl"
+LOOKUP_FILENAME = "house_rent_model_lut.pkl"
+META_FILENAME = "meta.json"
+SHARDS_DIRNAME = "shards"
+SHARD_MANIFEST_FILENAME = "manifest.json"
+
+
+def new_version() -> str:
+    return datetime.utcnow().strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+
+def version_dir(version: str, store_dir: str = MODEL_STORE_DIR) -> str:
+    if not version or os.path.basename(version) != version or version.startswith("."):
+        raise ValueError(f"Invalid model version: {version!r}")
+    return os.path.join(store_dir, version)
+
+
+def list_versions(store_dir: str = MODEL_STORE_DIR) -> list:
+    """Complete versions, oldest first."""
+    if not os.path.isdir(store_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(store_dir)
+        if not name.startswith(".")
+        and os.path.exists(os.path.join(store_dir, name, META_FILENAME))
+    )
+
+
+def latest_version(store_dir: str = MODEL_STORE_DIR):
+    versions = list_versions(store_dir)
+    return versions[-1] if versions else None
+
+
+def read_meta(version: str, store_dir: str = MODEL_STORE_DIR) -> dict:
+    with open(os.path.join(version_dir(version, store_dir), META_FILENAME)) as fh:
+        return json.load(fh)
+
+
+def publish_version(pipeline, fast_arrays=None, meta=None, store_dir: str = MODEL_STORE_DIR,
+                    lookup_arrays=None, shards=None, shards_from=None) -> str:
+    """Write a new version atomically and return its name.
+
+    ``shards`` maps a city to ``(pipeline, fast_arrays, info)``; each is
+    written under ``shards/`` and listed, with ``info``, in its manifest.
+    ``shards_from`` instead copies another version's ``shards/`` unchanged.
+    """
+    from fast_predictor import save_arrays
+
+    version = new_version()
+    os.makedirs(store_dir, exist_ok=True)
+    staging = os.path.join(store_dir, f".tmp-{version}")
+    os.makedirs(staging)
+    try:
+        # Uncompressed, so numpy arrays in the pickle can be memory-mapped
+        joblib.dump(pipeline, os.path.join(staging, MODEL_FILENAME), compress=0)
+        if fast_arrays is not None:
+            save_arrays(fast_arrays, os.path.join(staging, FAST_MODEL_FILENAME))
+        if lookup_arrays is not None:
+            save_arrays(lookup_arrays, os.path.join(staging, LOOKUP_FILENAME))
+        if shards:
+            _write_shards(shards, os.path.join(staging, SHARDS_DIRNAME))
+        elif shards_from is not None:
+            shutil.copytree(os.path.join(version_dir(shards_from, store_dir), SHARDS_DIRNAME),
+                            os.path.join(staging, SHARDS_DIRNAME))
+        meta = dict(meta or {})
+        meta.setdefault("created_at", datetime.utcnow().isoformat())
+        meta["version"] = version
+        # meta.json marks the version as complete, so it is written last
+        with open(os.path.join(staging, META_FILENAME), "w") as fh:
+            json.dump(meta, fh, indent=2, default=str)
+        os.rename(staging, version_dir(version, store_dir))
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return version
+
+
+def _write_shards(shards: dict, directory: str) -> None:
+    from fast_predictor import save_arrays
+
+    os.makedirs(directory)
+    manifest = {}
+    # Numbered files, since city names are not safe file names
+    for i, (city, (pipeline, fast_arrays, info)) in enumerate(sorted(shards.items())):
+        entry = dict(info or {}, model=f"city-{i:03d}.pkl", fast=None)
+        joblib.dump(pipeline, os.path.join(directory, entry["model"]), compress=0)
+        if fast_arrays is not None:
+            entry["fast"] = f"city-{i:03d}_fast.pkl"
+            save_arrays(fast_arrays, os.path.join(directory, entry["fast"]))
+        manifest[city] = entry
+    with open(os.path.join(directory, SHARD_MANIFEST_FILENAME), "w") as fh:
+        json.dump({"cities": manifest}, fh, indent=2, default=str)
+
+
+def read_shard_manifest(version: str, store_dir: str = MODEL_STORE_DIR):
+    """The version's per-city manifest, or None when it has no shards."""
+    path = os.path.join(version_dir(version, store_dir), SHARDS_DIRNAME, SHARD_MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        return json.load(fh)
+
+
+class LazyPipeline:
+    """Defers ``joblib.load`` of a pipeline until it is first used.
+
+    With memory-mapped serving most requests are answered by the fast
+    predictor, so workers only pay for a private copy of the sklearn trees
+    if they actually receive a large batch.
+    """
+
+    def __init__(self, path: str, mmap_mode=None):
+        self.path = path
+        self.mmap_mode = mmap_mode
+        self._pipeline = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._pipeline is not None
+
+    def get(self):
+        if self._pipeline is None:
+            with self._lock:
+                if self._pipeline is None:
+                    self._pipeline = joblib.load(self.path, mmap_mode=self.mmap_mode)
+        return self._pipeline
+
+    def predict(self, X):
+        return self.get().predict(X)
+
+    def __getattr__(self, name):
+        # named_steps, get_params, ... for code that inspects the pipeline
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
@@ -0,0 +1,96 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Coalesces single-row predictions from many threads into one call.
+
+    ``submit(row, key)`` returns a Future. A background thread takes the
+    first queued row, keeps collecting until ``window_ms`` has passed or
+    ``max_rows`` rows are waiting, then calls ``predict_fn(rows, key)`` once
+    per distinct ``key`` in the batch and resolves each caller's future with
+    its own value. ``key`` is the model the row must be scored with, so a
+    model swap in the middle of a window never mixes two models in one call.
+
+    The thread is started on first use and restarted after a fork, so the
+    batcher can be created at import time in a gunicorn master.
+    """
+
+    def __init__(self, predict_fn, window_ms=2.0, max_rows=64):
+        self.predict_fn = predict_fn
+        self.window = float(window_ms) / 1000.0
+        self.max_rows = max(int(max_rows), 1)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.batches = 0
+        self.rows = 0
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name="prediction-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, row, key=None) -> Future:
+        self._ensure_started()
+        future = Future()
+        self._queue.put((row, key, future))
+        return future
+
+    def predict(self, rows, key=None, timeout=None):
+        """Submit ``rows`` and wait for all of their values."""
+        futures = [self.submit(row, key) for row in rows]
+        return [f.result(timeout) for f in futures]
+
+    def _collect(self, q):
+        batch = [q.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        q = self._queue
+        while True:
+            batch = self._collect(q)
+            groups = {}
+            for row, key, future in batch:
+                if future.set_running_or_notify_cancel():
+                    groups.setdefault(id(key), (key, []))[1].append((row, future))
+            for key, items in groups.values():
+                try:
+                    values = self.predict_fn([row for row, _ in items], key)
+                    for (_, future), value in zip(items, values):
+                        future.set_result(value)
+                except Exception as e:
+                    for _, future in items:
+                        future.set_exception(e)
+            self.batches += 1
+            self.rows += len(batch)
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_rows": self.max_rows,
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_rows": (self.rows / self.batches) if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """Bounded LRU cache of model predictions with an optional TTL.
+
+    Keys are canonical feature tuples in ``PREDICTION_FEATURES`` order:
+    ``(Size, BHK, Bathroom, City, Furnishing Status, Tenant Preferred, Area Type)``.
+    When ``size_bucket`` is set, Size is rounded to the nearest bucket so that
+    near-identical listings share an entry (the model is then evaluated at the
+    bucketed size, keeping cached values deterministic).
+
+    Every entry is tied to a model generation. ``invalidate()`` bumps the
+    generation and drops all entries; ``get()`` and ``put()`` take the
+    generation of the model the caller is using and treat a mismatch as a
+    miss / no-op, so a prediction from a model that has just been replaced
+    can never be served afterwards.
+    """
+
+    def __init__(self, max_entries=4096, ttl_seconds=0, size_bucket=0):
+        self.max_entries = int(max_entries or 0)
+        self.ttl_seconds = float(ttl_seconds or 0)
+        self.size_bucket = float(size_bucket or 0)
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def make_key(self, features):
+        size, bhk, bathroom, city, furnishing, tenant, area_type = features
+        size = float(size)
+        if self.size_bucket:
+            size = round(size / self.size_bucket) * self.size_bucket
+        return (
+            size,
+            int(bhk),
+            int(bathroom),
+            str(city or "").strip(),
+            str(furnishing or "").strip(),
+            str(tenant or "").strip(),
+            str(area_type or "").strip(),
+        )
+
+    def get(self, key, generation):
+        with self._lock:
+            entry = self._entries.get(key) if generation == self.generation else None
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, generation):
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Drop every entry and return the new generation."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.invalidations += 1
+            return self.generation
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "size_bucket": self.size_bucket,
+                "generation": self.generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,181 @@
+"""In-process inverted index with prefix search, for autocomplete and the customer search.
+
+Entries are the things a user can pick from a suggestion list:
+
+* ``city``: every city in the UI dataset or the Property table, with its
+  number of listings;
+* ``locality``: every Area Locality of the UI dataset, with its city;
+* ``property``: every Property row, searchable by title, city, address
+  and description.
+
+Each entry's text is split into lowercase tokens. ``_postings`` maps a
+token to the entries that contain it and ``_terms`` keeps the tokens
+sorted, so the entries for a prefix are a ``bisect`` range away. A query
+matches an entry when every query token is a prefix of one of its tokens.
+
+The customer search's location filter only looks at city entries
+(``cities``), matching city names by case-insensitive substring.
+
+Property writes are applied in place (``upsert_property`` /
+``remove_property``); nothing else is rebuilt.
+"""
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+KINDS = ("city", "locality", "property")
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 50
+# More cities than this and the location filter falls back to a SQL scan
+MAX_FILTER_CITIES = 100
+
+
+def tokenize(text) -> list:
+    return TOKEN_RE.findall(str(text or "").lower())
+
+
+class SearchIndex:
+    """Prefix-searchable entries; safe to query while another thread updates it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._terms = []         # sorted distinct tokens
+        self._postings = {}      # token -> set of entry keys
+        self._entries = {}       # entry key -> suggestion dict
+        self._entry_terms = {}   # entry key -> tokens it is indexed under
+        self._city_counts = {}   # city -> listings, dataset rows plus Property rows
+        self._properties = {}    # Property id -> city it was counted under
+        # Inventory this index reflects; set by the owner (see app.get_search_index)
+        self.key = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ---- building ----------------------------------------------------------
+
+    def _add(self, key, entry: dict, text: str) -> None:
+        terms = set(tokenize(text))
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = set()
+                insort(self._terms, term)
+            postings.add(key)
+        self._entries[key] = entry
+        self._entry_terms[key] = terms
+
+    def _remove(self, key) -> None:
+        self._entries.pop(key, None)
+        for term in self._entry_terms.pop(key, ()):
+            postings = self._postings[term]
+            postings.discard(key)
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+
+    def _count_city(self, city: str, delta: int) -> None:
+        if not city:
+            return
+        count = self._city_counts.get(city, 0) + delta
+        key = ("city", city)
+        if count <= 0:
+            self._city_counts.pop(city, None)
+            self._remove(key)
+        elif key in self._entries:
+            self._city_counts[city] = count
+            self._entries[key]["count"] = count
+        else:
+            self._city_counts[city] = count
+            self._add(key, {"type": "city", "label": city, "count": count}, city)
+
+    def add_frame(self, df) -> None:
+        """Cities and localities of the UI dataset."""
+        if df is None or df.empty or "City" not in df.columns:
+            return
+        cities = df["City"].dropna().astype(str)
+        with self._lock:
+            for city, count in cities.value_counts().items():
+                self._count_city(city, int(count))
+            if "Area Locality" not in df.columns:
+                return
+            pairs = df.loc[cities.index, "Area Locality"].dropna().astype(str)
+            counts = pairs.groupby([pairs, cities.loc[pairs.index]]).size()
+            for (locality, city), count in counts.items():
+                entry = {"type": "locality", "label": locality, "city": city, "count": int(count)}
+                self._add(("locality", locality, city), entry, locality)
+
+    def upsert_property(self, prop) -> None:
+        """Index a Property row, replacing what was indexed for it before."""
+        city = str(prop.city or "")
+        entry = {"type": "property", "label": str(prop.title or ""), "city": city, "id": prop.id}
+        text = " ".join(str(value or "") for value in (prop.title, prop.city, prop.address, prop.description))
+        with self._lock:
+            self._drop_property(prop.id)
+            self._add(("property", prop.id), entry, text)
+            self._properties[prop.id] = city
+            self._count_city(city, 1)
+
+    def remove_property(self, property_id) -> None:
+        with self._lock:
+            self._drop_property(property_id)
+
+    def _drop_property(self, property_id) -> None:
+        if property_id in self._properties:
+            self._count_city(self._properties.pop(property_id), -1)
+            self._remove(("property", property_id))
+
+    # ---- queries -----------------------------------------------------------
+
+    def _prefix_range(self, prefix: str):
+        start = bisect_left(self._terms, prefix)
+        return start, bisect_left(self._terms, prefix + "\uffff", start)
+
+    def _matches(self, query: str, kinds=None) -> list:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        ranges = {token: self._prefix_range(token) for token in set(tokens)}
+        # Expand the most selective prefix, then check the other tokens per candidate
+        seed = min(ranges, key=lambda token: ranges[token][1] - ranges[token][0])
+        start, stop = ranges[seed]
+        candidates = set()
+        for term in self._terms[start:stop]:
+            candidates.update(self._postings[term])
+        others = [token for token in ranges if token != seed]
+        return [
+            key for key in candidates
+            if (kinds is None or key[0] in kinds)
+            and all(any(term.startswith(token) for term in self._entry_terms[key]) for token in others)
+        ]
+
+    def search(self, query: str, limit: int = DEFAULT_SUGGESTIONS, kinds=None) -> list:
+        """Best ``limit`` suggestions: labels starting with the query first,
+        then cities, localities and properties, busiest first."""
+        limit = max(1, min(int(limit), MAX_SUGGESTIONS))
+        needle = query.strip().lower()
+        rank = {kind: i for i, kind in enumerate(KINDS)}
+        with self._lock:
+            entries = [self._entries[key] for key in self._matches(query, kinds)]
+            best = heapq.nsmallest(limit, entries, key=lambda e: (
+                not e["label"].lower().startswith(needle), rank[e["type"]], -e.get("count", 0), e["label"],
+            ))
+            return [dict(entry) for entry in best]
+
+    def cities(self, query: str) -> list:
+        """Every indexed city whose name contains ``query``, ignoring case and
+        surrounding whitespace; none for a blank query."""
+        needle = query.strip().lower()
+        if not needle:
+            return []
+        with self._lock:
+            return [city for city in self._city_counts if needle in city.lower()]
+
+
+def build_search_index(df=None, properties=()) -> SearchIndex:
+    index = SearchIndex()
+    index.add_frame(df)
+    for prop in properties:
+        index.upsert_property(prop)
+    return index
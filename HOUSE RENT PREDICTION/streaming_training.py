@@ -0,0 +1,191 @@
+"""Out-of-core training for CSV files larger than memory.
+
+Two passes over the file, ``chunk_rows`` rows at a time:
+
+1. Fit the StandardScaler incrementally (``partial_fit``), collect the
+   categorical vocabulary and keep a bounded sample of held-out rows.
+2. Stream the training rows through the fitted preprocessor and group them
+   into shards of ``shard_rows``. Each shard becomes an xgboost
+   ``QuantileDMatrix`` (histogram-quantised) and continues boosting the
+   same model for its share of ``num_boost_round`` rounds, then is freed.
+
+Gradient boosting keeps gradients and row partitions for every row it
+trains on, so even xgboost's external-memory matrix grows with the file
+(about 30 bytes per row here). Boosting shard by shard keeps peak memory a
+function of ``shard_rows``, ``chunk_rows``, the vocabulary size and
+``max_eval_rows`` only. The result is a regular ``Pipeline``
+(preprocessor + XGBRegressor) that app.py serves like any other model.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from train_model import (
+    build_preprocessor, categorical_features, feature_columns, numeric_features,
+    required_cols, target_column,
+)
+
+STREAM_CHUNK_ROWS = 200_000
+STREAM_SHARD_ROWS = 1_000_000
+HOLDOUT_PERCENT = 20
+
+XGB_STREAM_PARAMS = {
+    "objective": "reg:squarederror",
+    "tree_method": "hist",
+    "max_depth": 8,
+    "eta": 0.1,
+    "max_bin": 256,
+    "seed": 42,
+}
+
+
+def iter_chunks(path, chunk_rows=STREAM_CHUNK_ROWS):
+    """Yield cleaned chunks (same cleaning as train_model.prepare_training_data)
+    with a ``_row`` column holding each row's position in the file."""
+    offset = 0
+    for chunk in pd.read_csv(path, usecols=required_cols, chunksize=chunk_rows):
+        chunk["_row"] = np.arange(offset, offset + len(chunk), dtype=np.int64)
+        offset += len(chunk)
+        chunk[target_column] = pd.to_numeric(chunk[target_column], errors="coerce")
+        yield chunk.dropna(subset=required_cols)
+
+
+def is_holdout(row_ids, percent=HOLDOUT_PERCENT):
+    # Multiplicative hash of the row position: a stable, unordered split
+    return ((row_ids.astype(np.uint64) * np.uint64(2654435761)) % np.uint64(2**32)) % np.uint64(100) < percent
+
+
+def scan(path, chunk_rows=STREAM_CHUNK_ROWS, max_eval_rows=50_000):
+    """First pass: scaler statistics, vocabulary and a held-out sample."""
+    scaler = StandardScaler()
+    vocabulary = {column: set() for column in categorical_features}
+    holdout, n_train, n_holdout = [], 0, 0
+    for chunk in iter_chunks(path, chunk_rows):
+        test = is_holdout(chunk["_row"].to_numpy())
+        train = chunk[~test]
+        if len(train):
+            scaler.partial_fit(train[numeric_features].to_numpy(dtype=np.float64))
+            for column in categorical_features:
+                vocabulary[column].update(train[column].astype(str).unique())
+        n_train += len(train)
+        n_holdout += int(test.sum())
+        kept = sum(len(h) for h in holdout)
+        if kept < max_eval_rows and test.any():
+            holdout.append(chunk[test].head(max_eval_rows - kept))
+    holdout = pd.concat(holdout, ignore_index=True) if holdout else pd.DataFrame(columns=required_cols)
+    return scaler, {c: sorted(v) for c, v in vocabulary.items()}, holdout, n_train, n_holdout
+
+
+def fitted_preprocessor(scaler, vocabulary) -> ColumnTransformer:
+    """The train_model.py preprocessor, fitted from pass-one statistics.
+
+    It is fitted on a small frame that contains every category once, so the
+    encoder's ``categories_`` match a full in-memory fit, and the scaler's
+    statistics are then replaced with the streamed ones.
+    """
+    n_rows = max([len(v) for v in vocabulary.values()] + [1])
+    frame = pd.DataFrame({column: np.resize(np.asarray(values, dtype=object), n_rows)
+                          for column, values in vocabulary.items()})
+    for column in numeric_features:
+        frame[column] = 0.0
+    preprocessor = build_preprocessor()
+    preprocessor.fit(frame[feature_columns])
+    fitted_scaler = preprocessor.named_transformers_["num"].named_steps["scaler"]
+    for attribute in ("mean_", "var_", "scale_", "n_samples_seen_"):
+        setattr(fitted_scaler, attribute, getattr(scaler, attribute))
+    return preprocessor
+
+
+def iter_shards(path, preprocessor, chunk_rows=STREAM_CHUNK_ROWS, shard_rows=STREAM_SHARD_ROWS):
+    """Yield lists of transformed ``(X, y)`` training chunks, ``shard_rows`` rows each
+    (the last shard may be shorter)."""
+    shard, n_rows = [], 0
+    for chunk in iter_chunks(path, chunk_rows):
+        train = chunk[~is_holdout(chunk["_row"].to_numpy())]
+        if not len(train):
+            continue
+        X = preprocessor.transform(train[feature_columns])
+        X = X.tocsr().astype(np.float32) if hasattr(X, "tocsr") else X.astype(np.float32)
+        y = train[target_column].to_numpy(dtype=np.float32)
+        while len(y):
+            take = min(shard_rows - n_rows, len(y))
+            shard.append((X[:take], y[:take]))
+            X, y = X[take:], y[take:]
+            n_rows += take
+            if n_rows == shard_rows:
+                yield shard
+                shard, n_rows = [], 0
+    if shard:
+        yield shard
+
+
+def _shard_matrix(shard, max_bin):
+    import xgboost as xgb
+
+    class ShardIterator(xgb.DataIter):
+        """Replays one shard's chunks; QuantileDMatrix reads them twice."""
+
+        def __init__(self):
+            self._position = 0
+            super().__init__()
+
+        def reset(self):
+            self._position = 0
+
+        def next(self, input_data):
+            if self._position == len(shard):
+                return False
+            X, y = shard[self._position]
+            input_data(data=X, label=y)
+            self._position += 1
+            return True
+
+    return xgb.QuantileDMatrix(ShardIterator(), max_bin=max_bin)
+
+
+def train_streaming(path, chunk_rows=STREAM_CHUNK_ROWS, num_boost_round=300, params=None,
+                    max_eval_rows=50_000, shard_rows=STREAM_SHARD_ROWS):
+    """Train on ``path`` in bounded memory. Returns ``(pipeline, report)``."""
+    try:
+        import xgboost as xgb
+    except ImportError as e:
+        raise ImportError("Streaming training needs xgboost (see requirements.txt)") from e
+
+    print("Pass 1: scanning", path)
+    scaler, vocabulary, holdout, n_train, n_holdout = scan(path, chunk_rows, max_eval_rows)
+    if not n_train:
+        raise ValueError(f"No usable training rows in {path}")
+    print(f"  {n_train:,} training rows, {n_holdout:,} held out "
+          f"({len(holdout):,} kept for evaluation)")
+    preprocessor = fitted_preprocessor(scaler, vocabulary)
+
+    params = dict(XGB_STREAM_PARAMS, **(params or {}))
+    n_shards = max(math.ceil(n_train / shard_rows), 1)
+    # Spread the rounds evenly; every shard gets at least one
+    rounds = [num_boost_round // n_shards + (i < num_boost_round % n_shards) or 1 for i in range(n_shards)]
+    booster = None
+    print(f"Pass 2: boosting over {n_shards} shard(s) of up to {shard_rows:,} rows")
+    for i, shard in enumerate(iter_shards(path, preprocessor, chunk_rows, shard_rows)):
+        matrix = _shard_matrix(shard, params["max_bin"])
+        n_rounds = rounds[i]
+        booster = xgb.train(params, matrix, num_boost_round=n_rounds, xgb_model=booster)
+        print(f"  shard {i + 1}/{n_shards}: {matrix.num_row():,} rows, {n_rounds} rounds")
+        del matrix, shard
+
+    model = xgb.XGBRegressor()
+    model.load_model(bytearray(booster.save_raw(raw_format="ubj")))
+    pipeline = Pipeline(steps=[("preprocessor", preprocessor), ("model", model)])
+
+    report = {"train_rows": n_train, "holdout_rows": n_holdout, "eval_rows": len(holdout),
+              "chunk_rows": chunk_rows, "shard_rows": shard_rows, "shards": n_shards,
+              "num_boost_round": booster.num_boosted_rounds()}
+    if len(holdout):
+        y_pred = pipeline.predict(holdout[feature_columns])
+        report["rmse"] = float(mean_squared_error(holdout[target_column], y_pred) ** 0.5)
+        report["r2"] = float(r2_score(holdout[target_column], y_pred))
+    return pipeline, report
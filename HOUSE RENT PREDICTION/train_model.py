@@ -1,13 +1,28 @@
+import argparse
+import io
+import json
+import logging
 import os
+import shutil
+import tempfile
+import time
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from sklearn.base import clone
+from sklearn.model_selection import KFold, ParameterGrid, ParameterSampler, cross_validate, train_test_split
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
 from sklearn.metrics import mean_squared_error, r2_score
 import joblib
 
+from bench_utils import summarize, time_calls
+from fast_predictor import FastForestPredictor, check_parity, export_pipeline, save_arrays
+import dataset_cache
+import lookup_table
+import model_store
+
 # =========================
 # CONFIG
 # =========================
@@ -26,123 +41,713 @@ MODEL_PATH = os.path.join(
     "house_rent_model.pkl"
 )
 
-# =========================
-# LOAD DATA
-# =========================
-
-print("Loading data from:", DATASET_PATH)
-df = pd.read_csv(DATASET_PATH)
+# Flattened NumPy copy of the same model for the serving fast path
+FAST_MODEL_PATH = os.path.join(
+    BASE_DIR,
+    "house_rent_model_fast.pkl"
+)
 
-print("Raw shape:", df.shape)
+numeric_features = ["Size", "BHK", "Bathroom"]
+categorical_features = ["City", "Furnishing Status", "Tenant Preferred", "Area Type"]
+feature_columns = numeric_features + categorical_features
+target_column = "Rent"
 
 # Make sure expected columns exist
-required_cols = [
-    "Size",
-    "BHK",
-    "Bathroom",
-    "City",
-    "Furnishing Status",
-    "Tenant Preferred",
-    "Area Type",
-    "Rent",
-]
-missing = [c for c in required_cols if c not in df.columns]
+required_cols = feature_columns + [target_column]
 
-if missing:
-    raise ValueError(f"Missing columns in CSV: {missing}")
+# Precomputed predictions over the discrete feature grid (--lookup-table)
+LOOKUP_PATH = os.path.join(
+    BASE_DIR,
+    "house_rent_model_lut.pkl"
+)
 
-# Ensure Rent is numeric (it already is from generator, but just in case)
-df["Rent"] = pd.to_numeric(df["Rent"], errors="coerce")
+# Where --compact writes its accuracy vs. latency/size report
+COMPACT_REPORT_PATH = os.path.join(
+    BASE_DIR,
+    "compact_model_report.json"
+)
 
-# Drop rows with missing values in important columns
-df = df.dropna(subset=required_cols)
+# Where --search writes its per-candidate report
+SEARCH_REPORT_PATH = os.path.join(
+    BASE_DIR,
+    "search_report.json"
+)
 
-print("Cleaned shape:", df.shape)
+# Everything prepare_training_data does to the raw CSV; part of the cache key,
+# so bump PREPARE_VERSION whenever the cleaning code changes
+PREPARE_VERSION = 1
+PREPARE_CONFIG = {
+    "version": PREPARE_VERSION,
+    "required_cols": required_cols,
+    "numeric_coerce": [target_column],
+    "dropna": required_cols,
+}
 
 # =========================
-# FEATURES / TARGET
+# LOAD DATA
 # =========================
 
-X = df[["Size", "BHK", "Bathroom", "City",
-        "Furnishing Status", "Tenant Preferred", "Area Type"]]
-y = df["Rent"]
+def load_training_data(path=DATASET_PATH, use_cache=True):
+    """Cleaned training frame, from the prepared-data cache when it is current."""
+    return dataset_cache.load_prepared(path, prepare_training_data, PREPARE_CONFIG, use_cache=use_cache)
 
-numeric_features = ["Size", "BHK", "Bathroom"]
-categorical_features = ["City", "Furnishing Status", "Tenant Preferred", "Area Type"]
+
+def prepare_training_data(path=DATASET_PATH):
+    print("Loading data from:", path)
+    df = pd.read_csv(path)
+
+    print("Raw shape:", df.shape)
+
+    missing = [c for c in required_cols if c not in df.columns]
+
+    if missing:
+        raise ValueError(f"Missing columns in CSV: {missing}")
+
+    # Ensure Rent is numeric (it already is from generator, but just in case)
+    df["Rent"] = pd.to_numeric(df["Rent"], errors="coerce")
+
+    # Drop rows with missing values in important columns
+    df = df.dropna(subset=required_cols)
+
+    print("Cleaned shape:", df.shape)
+    return df
 
 # =========================
 # PREPROCESSING PIPELINE
 # =========================
 
-numeric_transformer = Pipeline(
-    steps=[("scaler", StandardScaler())]
-)
+def build_preprocessor():
+    numeric_transformer = Pipeline(
+        steps=[("scaler", StandardScaler())]
+    )
 
-categorical_transformer = Pipeline(
-    steps=[("onehot", OneHotEncoder(handle_unknown="ignore"))]
-)
+    categorical_transformer = Pipeline(
+        steps=[("onehot", OneHotEncoder(handle_unknown="ignore"))]
+    )
 
-preprocessor = ColumnTransformer(
-    transformers=[
-        ("num", numeric_transformer, numeric_features),
-        ("cat", categorical_transformer, categorical_features),
-    ]
-)
+    return ColumnTransformer(
+        transformers=[
+            ("num", numeric_transformer, numeric_features),
+            ("cat", categorical_transformer, categorical_features),
+        ]
+    )
 
 # =========================
 # MODEL
 # =========================
 
-# 100 trees is enough for 10k rows and still fast
-model = RandomForestRegressor(
-    n_estimators=100,
-    max_depth=None,
-    n_jobs=-1,
-    random_state=42,
-)
-
-pipeline = Pipeline(
-    steps=[
-        ("preprocessor", preprocessor),
-        ("model", model),
-    ]
-)
+def build_pipeline(memory=None, **model_params):
+    # 100 trees is enough for 10k rows and still fast
+    params = {
+        "n_estimators": 100,
+        "max_depth": None,
+        "n_jobs": -1,
+        "random_state": 42,
+    }
+    params.update(model_params)
+
+    return Pipeline(
+        steps=[
+            ("preprocessor", build_preprocessor()),
+            ("model", RandomForestRegressor(**params)),
+        ],
+        # joblib.Memory location: fitted preprocessors are reused across candidates
+        memory=memory,
+    )
 
 # =========================
 # TRAIN / TEST SPLIT
 # =========================
 
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
-)
+def split_features(df):
+    X = df[feature_columns]
+    y = df[target_column]
+    return train_test_split(X, y, test_size=0.2, random_state=42)
 
-print("Training shape:", X_train.shape)
-print("Testing shape:", X_test.shape)
+
+def split_validation(X_train, y_train, size=0.2):
+    """Carve a validation split out of the training rows, for model choices
+    that must not look at the test split it is later reported on."""
+    return train_test_split(X_train, y_train, test_size=size, random_state=42)
 
 # =========================
-# TRAIN
+# EVALUATE
 # =========================
 
-print("Training model...")
-pipeline.fit(X_train, y_train)
+def evaluate(pipeline, X_test, y_test):
+    y_pred = pipeline.predict(X_test)
+    # Compute RMSE manually to avoid signature differences across sklearn versions
+    rmse = mean_squared_error(y_test, y_pred) ** 0.5
+    r2 = r2_score(y_test, y_pred)
+    return rmse, r2
 
 # =========================
-# EVALUATE
+# EXPORT FAST PATH
+# =========================
+
+def export_fast_predictor(pipeline, X_check, path=FAST_MODEL_PATH):
+    """Flatten the fitted pipeline for FastForestPredictor and verify parity."""
+    arrays = export_pipeline(pipeline)
+    rows = X_check[feature_columns].itertuples(index=False, name=None)
+    max_diff = check_parity(pipeline, FastForestPredictor(arrays), rows)
+    print(f"Fast predictor parity on {len(X_check)} rows: max abs diff {max_diff:.3g}")
+    print("Saving fast predictor to:", path)
+    save_arrays(arrays, path)
+    return arrays
+
+# =========================
+# EXPORT LOOKUP TABLE
+# =========================
+
+def export_lookup_table(pipeline, X_train, X_test, path=LOOKUP_PATH, n_knots=256,
+                        max_rel_error=0.02, check_points=8, check_error=None):
+    """Evaluate the pipeline over the feature grid and verify it on held-out rows.
+
+    ``max_rel_error`` decides which grid cells the table may answer, judged
+    at ``check_points`` sizes per cell; a forest can step between them, so
+    the table is also checked on X_test: the p99 relative error of the rows
+    it answers must stay within ``check_error`` (``max_rel_error`` by default).
+    Returns the arrays, or None (and no file) when the check fails.
+    """
+    axes = lookup_table.grid_axes(pipeline, X_train)
+    print("Building lookup table over", " x ".join(str(len(a)) for a in axes.values()),
+          f"combinations x {n_knots} Size knots...")
+    arrays = lookup_table.build_lookup_table(
+        pipeline, axes, X_train["Size"].min(), X_train["Size"].max(),
+        n_knots=n_knots, max_rel_error=max_rel_error, check_points=check_points,
+    )
+    table = lookup_table.PredictionLookupTable(arrays)
+    rows = X_test[feature_columns].itertuples(index=False, name=None)
+    try:
+        report = lookup_table.check_error(
+            pipeline, table, rows, max_rel_error=max_rel_error if check_error is None else check_error,
+        )
+    except AssertionError as e:
+        print("Lookup table rejected:", e)
+        return None
+    print(f"Lookup table: {table.coverage:.1%} of cells trusted, "
+          f"{report['hit_rate']:.1%} of test rows answered, "
+          f"p99 rel error {report['p99_rel_error']:.4f}, max {report['max_rel_error']:.4f}")
+    print("Saving lookup table to:", path)
+    lookup_table.save_arrays(arrays, path)
+    return arrays
+
+# =========================
+# PUBLISH VERSION
 # =========================
 
-y_pred = pipeline.predict(X_test)
-# Compute RMSE manually to avoid signature differences across sklearn versions
-rmse = mean_squared_error(y_test, y_pred) ** 0.5
-r2 = r2_score(y_test, y_pred)
+def publish_model(pipeline, fast_arrays, lookup_arrays=None, shards=None, **meta):
+    """Publish a versioned copy to model_store for hot reload by app.py."""
+    version = model_store.publish_version(pipeline, fast_arrays, meta, lookup_arrays=lookup_arrays,
+                                          shards=shards)
+    print("Published model version:", version)
+    return version
 
-print(f"RMSE: {rmse:,.2f}")
-print(f"R²: {r2:.4f}")
 
 # =========================
-# SAVE MODEL
+# COMPACT MODE
 # =========================
 
-print("Saving model to:", MODEL_PATH)
-joblib.dump(pipeline, MODEL_PATH)
+# Forest candidates, cheapest last: (n_estimators, max_depth, max_leaf_nodes)
+COMPACT_FOREST_GRID = [
+    (100, None, None),
+    (50, None, None),
+    (50, None, 1024),
+    (30, 16, None),
+    (30, None, 256),
+    (20, 12, None),
+    (10, 10, None),
+]
+
+# Single gradient-boosted models distilled from the full forest's out-of-bag outputs
+COMPACT_DISTILLED_GRID = [
+    {"n_estimators": 200, "max_depth": 4, "learning_rate": 0.1},
+    {"n_estimators": 100, "max_depth": 3, "learning_rate": 0.1},
+]
+
+
+def build_distilled_pipeline(**model_params):
+    params = {"random_state": 42}
+    params.update(model_params)
+
+    return Pipeline(
+        steps=[
+            ("preprocessor", build_preprocessor()),
+            ("model", GradientBoostingRegressor(**params)),
+        ]
+    )
+
+
+def is_forest(pipeline):
+    # Only random forests can be exported to the NumPy fast path
+    return isinstance(pipeline.named_steps["model"], RandomForestRegressor)
+
+
+def joblib_bytes(obj):
+    buffer = io.BytesIO()
+    joblib.dump(obj, buffer, compress=0)
+    return buffer.getvalue()
+
+
+def measure_serving_cost(pipeline, X_test, repeats=200):
+    """Single-row latency on the path app.py would use, and artifact size."""
+    rows = list(X_test[feature_columns].head(repeats).itertuples(index=False, name=None))
+    size_bytes = len(joblib_bytes(pipeline))
+    if is_forest(pipeline):
+        arrays = export_pipeline(pipeline)
+        fast = FastForestPredictor(arrays)
+        size_bytes += len(joblib_bytes(arrays))
+        samples = [time_calls(lambda row=row: fast.predict([row]), repeats=1, warmup=1)[0] for row in rows]
+    else:
+        frames = [pd.DataFrame([row], columns=feature_columns) for row in rows]
+        samples = [time_calls(lambda f=f: pipeline.predict(f), repeats=1, warmup=1)[0] for f in frames]
+    stats = summarize(samples)
+    return stats["p99_ms"], stats["p50_ms"], size_bytes
+
+
+def compact_candidates(X_train, y_train):
+    """Yield (name, fitted pipeline) for every compact candidate."""
+    teacher = None
+    for n_estimators, max_depth, max_leaf_nodes in COMPACT_FOREST_GRID:
+        name = f"rf-{n_estimators}-depth{max_depth or 'full'}-leaves{max_leaf_nodes or 'all'}"
+        pipeline = build_pipeline(
+            n_estimators=n_estimators, max_depth=max_depth, max_leaf_nodes=max_leaf_nodes,
+            # The first (largest) forest is the teacher; its out-of-bag
+            # predictions are the distillation targets
+            oob_score=teacher is None,
+        )
+        print("Training candidate:", name)
+        pipeline.fit(X_train, y_train)
+        if teacher is None:
+            teacher = pipeline
+        yield name, pipeline
+
+    # Distillation: fit on the teacher's out-of-bag predictions. In-sample
+    # predictions of a fully grown forest are nearly the raw rents again.
+    y_teacher = teacher.named_steps["model"].oob_prediction_
+    # A row that was in every tree's bootstrap has no out-of-bag prediction
+    y_teacher = np.where(np.isnan(y_teacher), np.asarray(y_train, dtype=float), y_teacher)
+    for params in COMPACT_DISTILLED_GRID:
+        name = f"gbm-distilled-{params['n_estimators']}-depth{params['max_depth']}"
+        pipeline = build_distilled_pipeline(**params)
+        print("Training candidate:", name)
+        pipeline.fit(X_train, y_teacher)
+        yield name, pipeline
+
+
+def train_compact(X_train, X_test, y_train, y_test, p99_budget_ms=None, size_budget_mb=None,
+                  report_path=COMPACT_REPORT_PATH):
+    """Train the compact candidates and return the most accurate one in budget.
+
+    Candidates are fitted on most of the training rows and the winner is
+    chosen by RMSE on the rest (``val_rmse``), so the held-out test split is
+    only used for the reported ``rmse`` / ``r2``. Every candidate is written
+    to the report, whether or not it meets the budget. Returns
+    ``(pipeline, rmse, r2, entry)``, or None when no candidate fits.
+    """
+    X_fit, X_val, y_fit, y_val = split_validation(X_train, y_train)
+    entries, pipelines = [], {}
+    for name, pipeline in compact_candidates(X_fit, y_fit):
+        val_rmse, _ = evaluate(pipeline, X_val, y_val)
+        rmse, r2 = evaluate(pipeline, X_test, y_test)
+        p99_ms, p50_ms, size_bytes = measure_serving_cost(pipeline, X_test)
+        entry = {
+            "name": name,
+            "estimator": type(pipeline.named_steps["model"]).__name__,
+            "params": {k: v for k, v in pipeline.named_steps["model"].get_params().items()
+                       if k in ("n_estimators", "max_depth", "max_leaf_nodes", "learning_rate")},
+            "val_rmse": float(val_rmse),
+            "rmse": float(rmse),
+            "r2": float(r2),
+            "p50_ms": p50_ms,
+            "p99_ms": p99_ms,
+            "size_mb": size_bytes / 2**20,
+            "serving_path": "fast" if is_forest(pipeline) else "sklearn",
+        }
+        entry["within_budget"] = (
+            (p99_budget_ms is None or p99_ms <= p99_budget_ms)
+            and (size_budget_mb is None or entry["size_mb"] <= size_budget_mb)
+        )
+        print(f"  val RMSE {val_rmse:,.2f}  test RMSE {rmse:,.2f}  R² {r2:.4f}  "
+              f"p99 {p99_ms:.3f} ms  {entry['size_mb']:.1f} MB")
+        entries.append(entry)
+        pipelines[name] = pipeline
+
+    in_budget = [e for e in entries if e["within_budget"]]
+    chosen = min(in_budget, key=lambda e: e["val_rmse"]) if in_budget else None
+
+    with open(report_path, "w") as fh:
+        json.dump({
+            "p99_budget_ms": p99_budget_ms,
+            "size_budget_mb": size_budget_mb,
+            "chosen": chosen["name"] if chosen else None,
+            "candidates": entries,
+        }, fh, indent=2)
+    print("Compact model report written to:", report_path)
+
+    print(f"\n{'candidate':<34} {'val RMSE':>10} {'test RMSE':>10} {'R²':>7} {'p99 ms':>8} {'MB':>7}")
+    for e in entries:
+        mark = "*" if e is chosen else (" " if e["within_budget"] else "x")
+        print(f"{mark}{e['name']:<33} {e['val_rmse']:>10,.2f} {e['rmse']:>10,.2f} {e['r2']:>7.4f} "
+              f"{e['p99_ms']:>8.3f} {e['size_mb']:>7.1f}")
+
+    if chosen is None:
+        return None
+    return pipelines[chosen["name"]], chosen["rmse"], chosen["r2"], chosen
+
+
+# =========================
+# HYPERPARAMETER SEARCH
+# =========================
+
+SEARCH_SPACE = {
+    "n_estimators": [50, 100, 200],
+    "max_depth": [None, 12, 20],
+    "min_samples_leaf": [1, 2, 4],
+    "max_features": [1.0, 0.5, "sqrt"],
+}
+
+
+def search_candidates(mode="random", n_iter=12, seed=42):
+    if mode == "grid":
+        return list(ParameterGrid(SEARCH_SPACE))
+    return list(ParameterSampler(SEARCH_SPACE, n_iter=n_iter, random_state=seed))
+
+
+def evaluate_candidate(params, X_train, y_train, cv, memory):
+    """Cross-validate one configuration; runs inside a worker process.
+
+    Trees fit single-threaded here since the candidates themselves are
+    spread over the pool. The first fold's model is timed and sized here
+    and then dropped, so only the small entry travels back to the parent.
+    """
+    start = time.perf_counter()
+    scores = cross_validate(
+        build_pipeline(memory=memory, n_jobs=1, **params), X_train, y_train,
+        cv=cv, scoring=("neg_root_mean_squared_error", "r2"), return_estimator=True,
+    )
+    wall_seconds = time.perf_counter() - start
+    p99_ms, p50_ms, size_bytes = measure_serving_cost(scores["estimator"][0], X_train)
+    return {
+        "params": params,
+        "cv_rmse": float(-scores["test_neg_root_mean_squared_error"].mean()),
+        "cv_rmse_std": float(scores["test_neg_root_mean_squared_error"].std()),
+        "cv_r2": float(scores["test_r2"].mean()),
+        "fit_seconds": float(scores["fit_time"].sum()),
+        "wall_seconds": wall_seconds,
+        "p50_ms": p50_ms,
+        "p99_ms": p99_ms,
+        "size_mb": size_bytes / 2**20,
+    }
+
+
+def run_search(X_train, y_train, mode="random", n_iter=12, folds=3, n_jobs=-1,
+               latency_weight=0.0, p99_budget_ms=None, report_path=SEARCH_REPORT_PATH):
+    """Cross-validate candidates across a process pool and return the winner's params.
+
+    The winner minimises ``cv_rmse * (1 + latency_weight * p99_ms)`` among
+    candidates within ``p99_budget_ms``. Latency is measured in the workers,
+    alongside the other candidates still fitting; use ``n_jobs=1`` when a
+    budget needs idle-machine numbers.
+    """
+    from joblib import Parallel, delayed
+
+    candidates = search_candidates(mode, n_iter)
+    cv = KFold(n_splits=folds, shuffle=True, random_state=42)
+    cache_dir = tempfile.mkdtemp(prefix="rent-search-")
+    print(f"Searching {len(candidates)} candidates x {folds} folds...")
+    start = time.perf_counter()
+    try:
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(evaluate_candidate)(params, X_train, y_train, cv, cache_dir)
+            for params in candidates
+        )
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    total_seconds = time.perf_counter() - start
+
+    for entry in results:
+        entry["within_budget"] = p99_budget_ms is None or entry["p99_ms"] <= p99_budget_ms
+        entry["objective"] = entry["cv_rmse"] * (1 + latency_weight * entry["p99_ms"])
+    in_budget = [e for e in results if e["within_budget"]]
+    winner = min(in_budget, key=lambda e: e["objective"]) if in_budget else None
+
+    with open(report_path, "w") as fh:
+        json.dump({
+            "mode": mode,
+            "folds": folds,
+            "latency_weight": latency_weight,
+            "p99_budget_ms": p99_budget_ms,
+            "total_seconds": total_seconds,
+            "winner": winner["params"] if winner else None,
+            "candidates": results,
+        }, fh, indent=2, default=str)
+    print("Search report written to:", report_path)
+
+    print(f"\n{'params':<70} {'CV RMSE':>10} {'p99 ms':>8} {'wall s':>7}")
+    for e in sorted(results, key=lambda e: e["objective"]):
+        mark = "*" if e is winner else (" " if e["within_budget"] else "x")
+        print(f"{mark}{json.dumps(e['params'], default=str, separators=(',', ':')):<69} {e['cv_rmse']:>10,.2f} "
+              f"{e['p99_ms']:>8.3f} {e['wall_seconds']:>7.1f}")
+    print(f"Search took {total_seconds:.1f}s")
+    return winner["params"] if winner else None
+
+
+# =========================
+# CITY SHARDS
+# =========================
 
-print("Done. Trained model saved as 'house_rent_model.pkl'")
+SHARD_MIN_ROWS = 50
+
+
+def train_city_shard(city, X_fit, y_fit, X_val, y_val, X_test, y_test, model_params):
+    """Fit one city's model; runs inside a worker process.
+
+    A model fitted on ``X_fit`` is scored on ``X_val`` to decide whether the
+    shard is served; the returned model is refitted on both and scored on
+    ``X_test`` for the report.
+    """
+    nan = float("nan")
+    start = time.perf_counter()
+    pipeline = build_pipeline(n_jobs=1, **model_params)
+    val_rmse = float(evaluate(pipeline.fit(X_fit, y_fit), X_val, y_val)[0]) if len(X_val) else nan
+    X_train, y_train = pd.concat([X_fit, X_val]), pd.concat([y_fit, y_val])
+    pipeline.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    rmse, r2 = evaluate(pipeline, X_test, y_test) if len(X_test) else (nan, nan)
+    return city, pipeline, export_pipeline(pipeline), {
+        "train_rows": len(X_train),
+        "val_rows": len(X_val),
+        "test_rows": len(X_test),
+        "val_rmse": val_rmse,
+        "rmse": float(rmse),
+        "r2": float(r2),
+        "fit_seconds": fit_seconds,
+    }
+
+
+def train_city_shards(global_pipeline, X_train, X_test, y_train, y_test, n_jobs=-1,
+                      min_rows=SHARD_MIN_ROWS, serve_all=False, model_params=None):
+    """Train one model per city across a process pool.
+
+    The serve decision is made on a validation split of the training rows:
+    each shard and a copy of ``global_pipeline`` are fitted without it, and
+    the shard is marked ``serve`` only when it is at least as accurate on
+    its city's validation rows (or with ``serve_all``); app.py routes every
+    other city to the global model. Test RMSE is reported for both, but not
+    used to choose. Returns ``{city: (pipeline, fast_arrays, info)}``.
+    """
+    from joblib import Parallel, delayed
+
+    nan = float("nan")
+    counts = X_train["City"].value_counts()
+    cities = sorted(counts[counts >= min_rows].index)
+    skipped = sorted(set(counts.index) - set(cities))
+    print(f"Training {len(cities)} city shards...")
+    if skipped:
+        print(f"{len(skipped)} cities under {min_rows} rows use the global model:", ", ".join(skipped))
+    X_fit, X_val, y_fit, y_val = split_validation(X_train, y_train)
+    start = time.perf_counter()
+    global_reference = clone(global_pipeline).fit(X_fit, y_fit)
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(train_city_shard)(
+            city,
+            X_fit[X_fit["City"] == city], y_fit[X_fit["City"] == city],
+            X_val[X_val["City"] == city], y_val[X_val["City"] == city],
+            X_test[X_test["City"] == city], y_test[X_test["City"] == city],
+            model_params or {},
+        )
+        for city in cities
+    )
+    print(f"City shards took {time.perf_counter() - start:.1f}s")
+
+    shards = {}
+    print(f"\n{'city':<20} {'rows':>6} {'shard val':>10} {'global val':>11} "
+          f"{'shard test':>11} {'global test':>12} serve")
+    for city, pipeline, arrays, info in results:
+        X_city, y_city = X_test[X_test["City"] == city], y_test[X_test["City"] == city]
+        X_city_val, y_city_val = X_val[X_val["City"] == city], y_val[X_val["City"] == city]
+        check_parity(pipeline, FastForestPredictor(arrays), X_city[feature_columns].itertuples(index=False, name=None))
+        global_val_rmse = float(evaluate(global_reference, X_city_val, y_city_val)[0]) if len(X_city_val) else nan
+        global_rmse = float(evaluate(global_pipeline, X_city, y_city)[0]) if len(X_city) else nan
+        info.update(global_val_rmse=global_val_rmse, global_rmse=global_rmse,
+                    serve=bool(serve_all or (len(X_city_val) and info["val_rmse"] <= global_val_rmse)))
+        shards[city] = (pipeline, arrays, info)
+        print(f"{city:<20} {info['train_rows']:>6} {info['val_rmse']:>10,.0f} {global_val_rmse:>11,.0f} "
+              f"{info['rmse']:>11,.0f} {global_rmse:>12,.0f} {'yes' if info['serve'] else 'no'}")
+    return shards
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the house rent model.")
+    parser.add_argument("--compact", action="store_true",
+                        help="train smaller candidates and keep the most accurate one within budget")
+    parser.add_argument("--p99-budget-ms", type=float, default=None,
+                        help="single-row p99 latency budget for --compact and --search")
+    parser.add_argument("--size-budget-mb", type=float, default=None,
+                        help="artifact size budget for --compact")
+    parser.add_argument("--report", default=COMPACT_REPORT_PATH)
+    parser.add_argument("--search", choices=("random", "grid"), default=None,
+                        help="cross-validated hyperparameter search, then train the winner")
+    parser.add_argument("--search-iter", type=int, default=12, help="candidates for --search random")
+    parser.add_argument("--search-folds", type=int, default=3)
+    parser.add_argument("--search-jobs", type=int, default=-1, help="worker processes for --search")
+    parser.add_argument("--latency-weight", type=float, default=0.0,
+                        help="objective is CV RMSE * (1 + weight * p99 ms)")
+    parser.add_argument("--data", default=None, help="training CSV (default: the 10k dataset)")
+    parser.add_argument("--stream", action="store_true",
+                        help="out-of-core training for files larger than memory (xgboost)")
+    parser.add_argument("--chunk-rows", type=int, default=200_000, help="CSV rows read at a time for --stream")
+    parser.add_argument("--shard-rows", type=int, default=1_000_000, help="rows boosted at a time for --stream")
+    parser.add_argument("--stream-rounds", type=int, default=300)
+    parser.add_argument("--no-data-cache", action="store_true",
+                        help="always re-parse the CSV instead of using the prepared-data cache")
+    parser.add_argument("--lookup-table", action="store_true",
+                        help="also precompute predictions over the discrete feature grid")
+    parser.add_argument("--lookup-knots", type=int, default=256)
+    parser.add_argument("--lookup-check-points", type=int, default=8,
+                        help="sizes checked inside each knot interval before a cell is trusted")
+    parser.add_argument("--lookup-max-error", type=float, default=0.02,
+                        help="relative error a grid cell may have and still be served, and the p99 "
+                             "held-out error the table must meet")
+    parser.add_argument("--sharded", action="store_true",
+                        help="also train one model per city; app.py routes each city to its own model")
+    parser.add_argument("--shard-jobs", type=int, default=-1, help="worker processes for --sharded")
+    parser.add_argument("--shard-min-rows", type=int, default=SHARD_MIN_ROWS,
+                        help="cities with fewer training rows get no shard")
+    parser.add_argument("--shard-serve-all", action="store_true",
+                        help="serve every shard, even where the global model is more accurate")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # Show dataset_cache progress on the console, as it printed before
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.stream and (args.compact or args.search or args.lookup_table or args.sharded):
+        raise SystemExit("--stream cannot be combined with --compact, --search, --lookup-table or --sharded")
+
+    if args.stream:
+        # Never holds the whole file; see streaming_training.py
+        X_train = X_test = None
+    else:
+        df = load_training_data(args.data or DATASET_PATH, use_cache=not args.no_data_cache)
+
+        X_train, X_test, y_train, y_test = split_features(df)
+
+        print("Training shape:", X_train.shape)
+        print("Testing shape:", X_test.shape)
+
+    # =========================
+    # TRAIN
+    # =========================
+
+    extra_meta = {}
+    train_rows = len(X_train) if X_train is not None else 0
+    if args.stream:
+        from streaming_training import train_streaming
+
+        pipeline, report = train_streaming(
+            args.data or DATASET_PATH,
+            chunk_rows=args.chunk_rows,
+            shard_rows=args.shard_rows,
+            num_boost_round=args.stream_rounds,
+        )
+        rmse, r2 = report.get("rmse", float("nan")), report.get("r2", float("nan"))
+        train_rows = report["train_rows"]
+        extra_meta = {"streaming": report}
+    elif args.compact:
+        result = train_compact(
+            X_train, X_test, y_train, y_test,
+            p99_budget_ms=args.p99_budget_ms,
+            size_budget_mb=args.size_budget_mb,
+            report_path=args.report,
+        )
+        if result is None:
+            raise SystemExit("No compact candidate meets the budget; see " + args.report)
+        pipeline, rmse, r2, chosen = result
+        print("Chosen compact model:", chosen["name"])
+        extra_meta = {"compact": chosen, "p99_budget_ms": args.p99_budget_ms,
+                      "size_budget_mb": args.size_budget_mb}
+    elif args.search:
+        params = run_search(
+            X_train, y_train,
+            mode=args.search,
+            n_iter=args.search_iter,
+            folds=args.search_folds,
+            n_jobs=args.search_jobs,
+            latency_weight=args.latency_weight,
+            p99_budget_ms=args.p99_budget_ms,
+            report_path=SEARCH_REPORT_PATH,
+        )
+        if params is None:
+            raise SystemExit("No search candidate meets the budget; see " + SEARCH_REPORT_PATH)
+        print("Training search winner:", params)
+        pipeline = build_pipeline(**params)
+        pipeline.fit(X_train, y_train)
+        rmse, r2 = evaluate(pipeline, X_test, y_test)
+        extra_meta = {"search": {"params": params, "mode": args.search}}
+    else:
+        pipeline = build_pipeline()
+
+        print("Training model...")
+        pipeline.fit(X_train, y_train)
+
+        rmse, r2 = evaluate(pipeline, X_test, y_test)
+
+    print(f"RMSE: {rmse:,.2f}")
+    print(f"R²: {r2:.4f}")
+
+    shards = None
+    if args.sharded:
+        shards = train_city_shards(
+            pipeline, X_train, X_test, y_train, y_test,
+            n_jobs=args.shard_jobs,
+            min_rows=args.shard_min_rows,
+            serve_all=args.shard_serve_all,
+            model_params=extra_meta.get("search", {}).get("params"),
+        )
+        extra_meta["city_shards"] = {"cities": len(shards),
+                                "served": sum(info["serve"] for _, _, info in shards.values())}
+
+    # =========================
+    # SAVE MODEL
+    # =========================
+
+    print("Saving model to:", MODEL_PATH)
+    # Uncompressed so app.py can load it with mmap_mode="r" (MODEL_MMAP)
+    joblib.dump(pipeline, MODEL_PATH, compress=0)
+
+    fast_arrays = None
+    if is_forest(pipeline):
+        fast_arrays = export_fast_predictor(pipeline, X_test)
+    elif os.path.exists(FAST_MODEL_PATH):
+        # A stale fast path would fail app.py's parity check; remove it
+        os.remove(FAST_MODEL_PATH)
+
+    lookup_arrays = None
+    if args.lookup_table:
+        lookup_arrays = export_lookup_table(
+            pipeline, X_train, X_test, n_knots=args.lookup_knots, max_rel_error=args.lookup_max_error,
+            check_points=args.lookup_check_points,
+        )
+    if lookup_arrays is None and os.path.exists(LOOKUP_PATH):
+        os.remove(LOOKUP_PATH)
+
+    publish_model(
+        pipeline,
+        fast_arrays,
+        lookup_arrays=lookup_arrays,
+        shards=shards,
+        rmse=rmse,
+        r2=r2,
+        train_rows=train_rows,
+        params=pipeline.named_steps["model"].get_params(),
+        **extra_meta,
+    )
+
+    print("Done. Trained model saved as 'house_rent_model.pkl'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,551 @@
+import hashlib
+import json
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+from urllib.parse import urlencode
+
+import numpy as np
+import pandas as pd
+
+import dataset_cache
+
+# Used when the dataset (or one of its columns) is unavailable
+DEFAULT_FURNISHING_OPTIONS = ("Furnished", "Semi-Furnished", "Unfurnished")
+DEFAULT_TENANT_OPTIONS = ("Bachelors", "Bachelors/Family", "Family")
+DEFAULT_AREA_TYPE_OPTIONS = ("Built Area", "Carpet Area", "Plot Area", "Super Area")
+DEFAULT_CONTACT_OPTIONS = ("Contact Agent", "Contact Builder", "Contact Owner")
+
+
+@dataclass(frozen=True)
+class DatasetMetadata:
+    """Option lists derived once from the UI dataset.
+
+    The ``*_options`` tuples feed the dropdowns, ``*_choices`` are ready-made
+    ``(value, label)`` pairs for SelectField and ``valid`` holds frozensets of
+    the accepted values per model feature for O(1) validation.
+    """
+
+    city_options: Tuple[str, ...]
+    furnishing_options: Tuple[str, ...]
+    tenant_options: Tuple[str, ...]
+    area_type_options: Tuple[str, ...]
+    contact_options: Tuple[str, ...]
+    locality_options: Tuple[str, ...]
+    localities_by_city: Mapping[str, Tuple[str, ...]]
+    valid: Mapping[str, frozenset]
+
+    @staticmethod
+    def _choices(options):
+        return tuple((o, o) for o in options)
+
+    @cached_property
+    def city_choices(self):
+        return self._choices(self.city_options)
+
+    @cached_property
+    def furnishing_choices(self):
+        return self._choices(self.furnishing_options)
+
+    @cached_property
+    def tenant_choices(self):
+        return self._choices(self.tenant_options)
+
+    @cached_property
+    def area_type_choices(self):
+        return self._choices(self.area_type_options)
+
+    @cached_property
+    def locality_choices(self):
+        return self._choices(self.locality_options)
+
+    @cached_property
+    def options_json(self) -> bytes:
+        """The dropdown options as served by /api/prediction-options."""
+        return json.dumps({
+            "cities": self.city_options,
+            "furnishing": self.furnishing_options,
+            "tenants": self.tenant_options,
+            "area_types": self.area_type_options,
+            "contacts": self.contact_options,
+            "localities_by_city": dict(self.localities_by_city),
+        }, separators=(",", ":")).encode("utf-8")
+
+    @cached_property
+    def options_version(self) -> str:
+        """Content hash of ``options_json``: the same on every worker for the same data."""
+        return hashlib.sha256(self.options_json).hexdigest()[:16]
+
+
+def _column_options(df, column, default=()):
+    if df is None or column not in df.columns:
+        return tuple(default)
+    try:
+        return tuple(sorted(set(df[column].dropna().astype(str))))
+    except Exception:
+        return tuple(default)
+
+
+def build_metadata(df) -> DatasetMetadata:
+    """Scan the dataset once and freeze everything the forms need."""
+    if df is not None and df.empty:
+        df = None
+
+    city_options = _column_options(df, "City")
+    furnishing_options = _column_options(df, "Furnishing Status", DEFAULT_FURNISHING_OPTIONS)
+    tenant_options = _column_options(df, "Tenant Preferred", DEFAULT_TENANT_OPTIONS)
+    area_type_options = _column_options(df, "Area Type", DEFAULT_AREA_TYPE_OPTIONS)
+    contact_options = _column_options(df, "Point of Contact", DEFAULT_CONTACT_OPTIONS)
+    locality_options = _column_options(df, "Area Locality")
+
+    localities_by_city = {}
+    if df is not None and "City" in df.columns and "Area Locality" in df.columns:
+        try:
+            pairs = df[["City", "Area Locality"]].dropna().astype(str).drop_duplicates()
+            for city, sub in pairs.groupby("City"):
+                localities_by_city[city] = tuple(sorted(sub["Area Locality"]))
+        except Exception:
+            localities_by_city = {}
+
+    return DatasetMetadata(
+        city_options=city_options,
+        furnishing_options=furnishing_options,
+        tenant_options=tenant_options,
+        area_type_options=area_type_options,
+        contact_options=contact_options,
+        locality_options=locality_options,
+        localities_by_city=MappingProxyType(localities_by_city),
+        valid=MappingProxyType({
+            "City": frozenset(city_options),
+            "Furnishing Status": frozenset(furnishing_options),
+            "Tenant Preferred": frozenset(tenant_options),
+            "Area Type": frozenset(area_type_options),
+            "Area Locality": frozenset(locality_options),
+        }),
+    )
+
+
+EMPTY_METADATA = build_metadata(None)
+
+
+# Typed schema for the UI dataset. Repetitive text columns become
+# categoricals (each distinct string stored once plus small integer codes);
+# integer columns are downcast after parsing, so a column with missing
+# values stays float instead of failing.
+UI_CATEGORICAL_COLUMNS = (
+    "Building Type", "Posted On", "Floor", "Area Type", "Area Locality",
+    "City", "Furnishing Status", "Tenant Preferred", "Point of Contact",
+)
+UI_INTEGER_COLUMNS = ("Year Built", "BHK", "Rent", "Size", "Bathroom")
+# Bump when prepare_ui_dataset changes so cached copies are rebuilt
+UI_SCHEMA_VERSION = 1
+UI_PREPARE_CONFIG = {
+    "version": UI_SCHEMA_VERSION,
+    "categorical": UI_CATEGORICAL_COLUMNS,
+    "integer": UI_INTEGER_COLUMNS,
+}
+
+
+def apply_ui_schema(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = df.columns.str.strip()
+    for column in UI_CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+    for column in UI_INTEGER_COLUMNS:
+        if column in df.columns and pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], downcast="integer")
+    return df
+
+
+def prepare_ui_dataset(path: str) -> pd.DataFrame:
+    return apply_ui_schema(pd.read_csv(path))
+
+
+def frame_footprint(df: pd.DataFrame) -> dict:
+    """Deep memory use of ``df``, in total and per column."""
+    usage = df.memory_usage(deep=True, index=True)
+    return {
+        "bytes": int(usage.sum()),
+        "columns": {
+            column: {"dtype": str(df[column].dtype), "bytes": int(usage[column])}
+            for column in df.columns
+        },
+    }
+
+
+def load_ui_frame(path: str, use_cache: bool = True, cache_dir: str = dataset_cache.DATA_CACHE_DIR):
+    """Load the typed UI dataset, from the binary cache when it is current.
+
+    Returns ``(df, stats)``; ``stats`` records the load time and footprint
+    for the diagnostics endpoint.
+    """
+    start = time.perf_counter()
+    df = dataset_cache.load_prepared(path, prepare_ui_dataset, UI_PREPARE_CONFIG,
+                                     cache_dir=cache_dir, use_cache=use_cache)
+    load_seconds = time.perf_counter() - start
+    footprint = frame_footprint(df)
+    return df, {
+        "source": os.path.abspath(path),
+        # Content fingerprint: the same on every worker for the same file
+        "version": dataset_cache.fingerprint(path, UI_PREPARE_CONFIG, cache_dir),
+        "rows": len(df),
+        "cache_enabled": use_cache,
+        "load_seconds": load_seconds,
+        "memory_bytes": footprint["bytes"],
+        "columns": footprint["columns"],
+    }
+
+
+def measure_untyped_load(path: str) -> dict:
+    """Load time and footprint of a plain ``pd.read_csv``, for comparison."""
+    start = time.perf_counter()
+    df = pd.read_csv(path)
+    load_seconds = time.perf_counter() - start
+    df.columns = df.columns.str.strip()
+    footprint = frame_footprint(df)
+    return {
+        "load_seconds": load_seconds,
+        "memory_bytes": footprint["bytes"],
+        "columns": footprint["columns"],
+    }
+
+
+class RentIndex:
+    """Rents sorted per city for fast price-window lookups.
+
+    For every city (and for the whole dataset under ``None``) it keeps the
+    rents in ascending order next to the row positions they came from, so a
+    ``[low, high]`` window is two ``searchsorted`` calls and a slice. The
+    index holds a reference to the frame it was built from; callers read
+    rows through ``records()`` so a dataset reload can never pair the index
+    with a different frame.
+    """
+
+    def __init__(self, df=None):
+        self.frame = df
+        self._sorted = {}
+        if df is None or df.empty or "Rent" not in df.columns:
+            return
+        rents = pd.to_numeric(df["Rent"], errors="coerce").to_numpy(dtype="float64")
+        positions = np.flatnonzero(~np.isnan(rents))
+        self._sorted[None] = self._sort(rents, positions)
+        if "City" in df.columns:
+            cities = df["City"].to_numpy()
+            for city, city_positions in pd.Series(positions).groupby(cities[positions]).groups.items():
+                self._sorted[city] = self._sort(rents, positions[np.asarray(city_positions)])
+
+    @staticmethod
+    def _sort(rents, positions):
+        order = np.argsort(rents[positions], kind="stable")
+        return rents[positions][order], positions[order]
+
+    def __len__(self):
+        return len(self._sorted[None][0]) if None in self._sorted else 0
+
+    def window(self, low: float, high: float, city: Optional[str] = None) -> np.ndarray:
+        """Row positions with ``low <= Rent <= high``, in dataset order."""
+        entry = self._sorted.get(city)
+        if entry is None:
+            return np.empty(0, dtype=np.intp)
+        rents, positions = entry
+        start = np.searchsorted(rents, low, side="left")
+        stop = np.searchsorted(rents, high, side="right")
+        return np.sort(positions[start:stop])
+
+    def records(self, low: float, high: float, city: Optional[str] = None, limit: int = 50):
+        """First ``limit`` matching rows as dicts, like ``df[mask].head(limit)``."""
+        if self.frame is None:
+            return []
+        positions = self.window(low, high, city)[:limit]
+        return self.frame.iloc[positions].to_dict("records")
+
+
+EMPTY_RENT_INDEX = RentIndex(None)
+
+
+def _number_column(df, column, convert):
+    """``convert(value or 0)`` for every row as float64, NaN where it raises.
+
+    ``convert`` is ``float`` for Size/Rent and ``int`` for BHK/Bathroom,
+    exactly as the old per-row scorer applied it. Numeric columns take the
+    vectorized route; anything else is converted value by value once, here.
+    """
+    if column not in df.columns:
+        return np.zeros(len(df)), None
+    series = df[column]
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        values = series.to_numpy(dtype="float64")
+        if convert is int:
+            # int() truncates and raises on NaN; NaN marks "skip this term"
+            values = np.trunc(values)
+        return values, None
+    values = np.empty(len(df))
+    failed = np.zeros(len(df), dtype=bool)
+    for i, value in enumerate(series.tolist()):
+        try:
+            values[i] = convert(value or 0)
+        except Exception:
+            values[i], failed[i] = np.nan, True
+    return values, failed if convert is float and failed.any() else None
+
+
+class NearestListingIndex:
+    """Per-city feature arrays for ``enrich_from_dataset``'s nearest-row match.
+
+    Scores rows of the requested city (all rows when it has none) with the
+    old per-row scorer's arithmetic, term by term in the same order::
+
+        |Size - size| / 1000 + 0.5 * |Rent - rent| / max(rent or 1, 1)
+            + 0.2 * |BHK - bhk| + 0.2 * |Bathroom - bath|
+
+    A missing Size or Rent makes a row's score NaN, a missing BHK or
+    Bathroom drops that term. The first row wins when its score is NaN,
+    otherwise the first row with the lowest score, so results match the
+    old ``min`` loop exactly.
+    """
+
+    def __init__(self, df=None):
+        self.frame = df
+        self._groups = {}
+        if df is None or df.empty:
+            return
+        size, size_failed = _number_column(df, "Size", float)
+        rent, rent_failed = _number_column(df, "Rent", float)
+        bhk, _ = _number_column(df, "BHK", int)
+        bath, _ = _number_column(df, "Bathroom", int)
+        features = np.column_stack([size, rent, bhk, bath])
+        # Size/Rent values float() rejected contribute nothing, as before
+        skipped = np.column_stack([
+            size_failed if size_failed is not None else np.zeros(len(df), dtype=bool),
+            rent_failed if rent_failed is not None else np.zeros(len(df), dtype=bool),
+        ])
+        has_skips = size_failed is not None or rent_failed is not None
+
+        def group(positions):
+            return positions, features[positions], skipped[positions] if has_skips else None
+
+        self._groups[None] = group(np.arange(len(df)))
+        if "City" in df.columns:
+            keys = df["City"].astype(str).to_numpy()
+            for city, positions in pd.Series(np.arange(len(df))).groupby(keys).groups.items():
+                self._groups[city] = group(np.asarray(positions))
+
+    def __len__(self):
+        return len(self._groups[None][0]) if None in self._groups else 0
+
+    def nearest_position(self, city: str, size: float, rent: float, bhk: int, bath: int):
+        """Frame position of the best-matching row, or None without data."""
+        positions, features, skipped = self._groups.get(city or None) or self._groups.get(None, (None,) * 3)
+        if positions is None or not len(positions):
+            return None
+        score = np.abs(features[:, 0] - size) / 1000.0
+        if skipped is not None:
+            score[skipped[:, 0]] = 0.0
+        rent_term = 0.5 * np.abs(features[:, 1] - rent) / max(rent or 1.0, 1.0)
+        if skipped is not None:
+            rent_term[skipped[:, 1]] = 0.0
+        score += rent_term
+        for column, target in ((2, bhk), (3, bath)):
+            term = 0.2 * np.abs(features[:, column] - target)
+            score += np.where(np.isnan(features[:, column]), 0.0, term)
+        best = 0 if np.isnan(score[0]) else int(np.nanargmin(score))
+        return int(positions[best])
+
+    def nearest(self, city: str, size: float, rent: float, bhk: int, bath: int):
+        """The best-matching row as a dict (``to_dict("records")`` types), or None."""
+        position = self.nearest_position(city, size, rent, bhk, bath)
+        if position is None:
+            return None
+        return self.frame.iloc[[position]].to_dict("records")[0]
+
+
+EMPTY_NEAREST_INDEX = NearestListingIndex(None)
+
+
+def infer_built_types(bedrooms, area_types) -> np.ndarray:
+    """Vectorized ``app.infer_built_type`` over whole columns.
+
+    Plot areas are "Plot"; otherwise 0-2 bedrooms is an "Apartment", 3 an
+    "Independent House" and 4+ a "Villa". Bedroom counts are truncated like
+    ``int()`` and count as 0 when missing or unparsable; area types that
+    are not strings count as empty.
+    """
+    beds = pd.to_numeric(pd.Series(bedrooms), errors="coerce").to_numpy(dtype="float64")
+    beds = np.trunc(np.nan_to_num(beds, nan=0.0))
+    areas = pd.Series(area_types, dtype=object)
+    plot = areas.map(lambda a: isinstance(a, str) and a.strip().lower() == "plot area").to_numpy(dtype=bool)
+    return np.select(
+        [plot, beds <= 2, beds == 3],
+        ["Plot", "Apartment", "Independent House"],
+        default="Villa",
+    ).astype(object)
+
+
+@dataclass(frozen=True)
+class HomepageSummary:
+    """Homepage aggregates, computed once per loaded dataset.
+
+    ``featured_pool`` is a random sample of rows drawn at load time; each
+    request picks its featured cards from it, so the homepage costs the same
+    whatever the dataset size.
+    """
+
+    home_cities: Tuple[dict, ...] = ()
+    popular_cities: Tuple[dict, ...] = ()
+    property_types: Tuple[dict, ...] = ()
+    featured_pool: Tuple[dict, ...] = ()
+
+    def featured(self, k: int = 6):
+        return random.sample(self.featured_pool, min(k, len(self.featured_pool)))
+
+
+def build_homepage_summary(df, pool_size: int = 120) -> HomepageSummary:
+    if df is None or df.empty:
+        return HomepageSummary()
+
+    home_cities = popular_cities = ()
+    if "City" in df.columns:
+        city_counts = df["City"].dropna().astype(str).value_counts()
+        home_cities = tuple({"name": c, "count": int(n)} for c, n in city_counts.items())
+        popular_cities = home_cities[:40]
+
+    property_types = ()
+    try:
+        bedrooms = df["BHK"] if "BHK" in df.columns else np.zeros(len(df))
+        area_types = df["Area Type"] if "Area Type" in df.columns else np.full(len(df), "", dtype=object)
+        bt_counts = pd.Series(infer_built_types(bedrooms, area_types)).value_counts()
+        property_types = tuple({"name": name, "count": int(cnt)} for name, cnt in bt_counts.items())
+    except Exception:
+        property_types = ()
+
+    featured_pool = tuple(df.sample(min(pool_size, len(df))).to_dict("records"))
+    return HomepageSummary(home_cities, popular_cities, property_types, featured_pool)
+
+
+EMPTY_HOMEPAGE_SUMMARY = HomepageSummary()
+
+
+def derive_pid_from_row(row: dict) -> str:
+    """Stable ``TH########`` id for dataset rows that have no Property ID."""
+    try:
+        base = f"{row.get('City','')}-{row.get('BHK','')}-{row.get('Bathroom','')}-{row.get('Size','')}-{row.get('Rent','')}"
+        digest = hashlib.md5(base.encode('utf-8')).hexdigest()
+        num = int(digest[:8], 16) % 100000000
+        return f"TH{str(num).zfill(8)}"
+    except Exception:
+        return "TH00000000"
+
+
+# Characters Werkzeug leaves unescaped in url_for query strings
+_QUERY_SAFE = "!$'()*,/:;?@"
+
+
+def _preview_card(row: dict) -> dict:
+    """Card for listing-details.html's featured strip; ``query`` is the
+    property_preview query string (url_for's parameter order)."""
+    title = f"{int(row.get('BHK', 0) or 0)}-BHK in {row.get('City', '')}"
+    price = float(row.get("Rent", 0) or 0)
+    city = str(row.get("City", ""))
+    params = {
+        "title": title,
+        "price": price,
+        "bedrooms": int(row.get("BHK", 0) or 0),
+        "bathrooms": int(row.get("Bathroom", 0) or 0),
+        "area": float(row.get("Size", 0) or 0),
+        "category": str(row.get("Area Type", "")),
+        "address": str(row.get("Address", "")),
+        "city": city,
+        "furnishing_status": str(row.get("Furnishing Status", "")),
+        "tenant_preferred": str(row.get("Tenant Preferred", "")),
+        "pid": str(row.get("Property ID") or row.get("Property_ID") or derive_pid_from_row(row)),
+        "area_type": str(row.get("Area Type", "")),
+        "locality": str(row.get("Area Locality", "")),
+        "contact": str(row.get("Point of Contact", "")),
+    }
+    return {"title": title, "city": city, "price": price, "query": urlencode(params, safe=_QUERY_SAFE)}
+
+
+@dataclass(frozen=True)
+class PreviewPools:
+    """Featured cards for the property preview page, grouped by city.
+
+    Up to ``pool_size`` random rows per city (and for the whole dataset, used
+    when the city has none) are turned into cards once per dataset load, so
+    a preview page is a dict lookup plus a random rotation of its pool.
+    """
+
+    by_city: Mapping[str, Tuple[dict, ...]] = field(default_factory=lambda: MappingProxyType({}))
+    any_city: Tuple[dict, ...] = ()
+
+    def featured(self, city: str, k: int = 3) -> list:
+        pool = self.by_city.get(city) or self.any_city
+        if not pool:
+            return []
+        start = random.randrange(len(pool))
+        return [pool[(start + i) % len(pool)] for i in range(min(k, len(pool)))]
+
+
+def build_preview_pools(df, pool_size: int = 24) -> PreviewPools:
+    if df is None or df.empty:
+        return PreviewPools()
+
+    shuffled = df.sample(frac=1)
+    any_city = tuple(_preview_card(row) for row in shuffled.head(pool_size).to_dict("records"))
+    by_city = {}
+    if "City" in df.columns:
+        picked = shuffled.groupby(shuffled["City"].astype(str), sort=False).head(pool_size)
+        for row in picked.to_dict("records"):
+            card = _preview_card(row)
+            by_city.setdefault(card["city"], []).append(card)
+    return PreviewPools(MappingProxyType({city: tuple(cards) for city, cards in by_city.items()}), any_city)
+
+
+EMPTY_PREVIEW_POOLS = PreviewPools()
+
+
+@dataclass(frozen=True)
+class DatasetSnapshot:
+    """The UI dataset plus every index derived from it, published as one reference.
+
+    A snapshot is never modified after it is built. Readers take the current
+    snapshot once per request and use only its fields, so a reload that
+    swaps in a newer one cannot hand them a frame from one load and an index
+    from another. ``version`` counts publications in this process;
+    ``stats["version"]`` is the content fingerprint shared across workers.
+    """
+
+    version: int = 0
+    frame: Optional[pd.DataFrame] = None
+    meta: DatasetMetadata = EMPTY_METADATA
+    rent_index: RentIndex = EMPTY_RENT_INDEX
+    nearest_index: NearestListingIndex = EMPTY_NEAREST_INDEX
+    home_summary: HomepageSummary = EMPTY_HOMEPAGE_SUMMARY
+    preview_pools: PreviewPools = EMPTY_PREVIEW_POOLS
+    stats: Mapping[str, object] = field(default_factory=lambda: MappingProxyType({}))
+
+    @property
+    def has_rows(self) -> bool:
+        return self.frame is not None and not self.frame.empty
+
+
+def build_dataset_snapshot(path: str, version: int, use_cache: bool = True, home_pool_size: int = 120,
+                           preview_pool_size: int = 24) -> DatasetSnapshot:
+    """Load ``path`` and build all of its indexes; raises when the file cannot be read."""
+    df, stats = load_ui_frame(path, use_cache=use_cache)
+    return DatasetSnapshot(
+        version=version,
+        frame=df,
+        meta=build_metadata(df),
+        rent_index=RentIndex(df),
+        nearest_index=NearestListingIndex(df),
+        home_summary=build_homepage_summary(df, pool_size=home_pool_size),
+        preview_pools=build_preview_pools(df, pool_size=preview_pool_size),
+        stats=MappingProxyType(stats),
+    )
+
+
+EMPTY_SNAPSHOT = DatasetSnapshot()